@@ -0,0 +1,84 @@
+"""格式恢复耗时对比：逐范围 tag_add/tag_config/tag_raise 与按样式批量 tag add
+
+用法：python benchmarks/bench_tag_restore.py [样式段数量]（默认 10000，需要图形界面环境）
+"""
+import os
+import random
+import sys
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from main import LineIndex, add_style_run_tags  # noqa: E402
+
+COLORS = ['#c0392b', '#2980b9', '#27ae60', '#8e44ad', '#d35400', '#16a085', '#2c3e50', '#f39c12']
+
+
+def build_document(run_count):
+    """生成文本及不重叠的样式段，返回 (文本, 样式段数组, 旧版 color_ranges)"""
+    random.seed(0)
+    lines = [' '.join('word%d' % random.randrange(1000) for _ in range(12)) for _ in range(run_count // 4 + 1)]
+    text = '\n'.join(lines) + '\n'
+    line_index = LineIndex(text)
+    style_runs = []
+    color_ranges = []
+    offset = 0
+    step = max(2, (len(text) - 1) // run_count)
+    for _ in range(run_count):
+        length = random.randint(1, step - 1)
+        color = random.randrange(len(COLORS))
+        style_runs.extend((offset, length, color))
+        color_ranges.append({'start': line_index.index(offset), 'end': line_index.index(offset + length),
+                             'color': COLORS[color]})
+        offset += step
+    return text, style_runs, color_ranges
+
+
+def restore_per_range(text_widget, color_ranges):
+    """旧做法：每个范围一个新标签，三次 Tcl 调用"""
+    for i, color_range in enumerate(color_ranges):
+        tag_name = f'color_{i}'
+        text_widget.tag_add(tag_name, color_range['start'], color_range['end'])
+        text_widget.tag_config(tag_name, foreground=color_range['color'])
+        text_widget.tag_raise(tag_name)
+
+
+def restore_batched(text_widget, text, style_runs):
+    """新做法：每种样式配置一次共享标签，由编辑器使用的 add_style_run_tags 一次 tag add 添加全部范围"""
+    tags = []
+    for position, color in enumerate(COLORS):
+        tag_name = f'style_{position + 1}'
+        text_widget.tag_config(tag_name, foreground=color)
+        tags.append(tag_name)
+    add_style_run_tags(text_widget, style_runs, tags, LineIndex(text))
+
+
+def measure(root, text, restore):
+    text_widget = tk.Text(root)
+    text_widget.insert('1.0', text)
+    started = time.perf_counter()
+    restore(text_widget)
+    text_widget.update_idletasks()
+    elapsed = time.perf_counter() - started
+    tag_count = len(text_widget.tag_names())
+    text_widget.destroy()
+    return elapsed, tag_count
+
+
+def main():
+    run_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    text, style_runs, color_ranges = build_document(run_count)
+    root = tk.Tk()
+    root.withdraw()
+    before, before_tags = measure(root, text, lambda widget: restore_per_range(widget, color_ranges))
+    after, after_tags = measure(root, text, lambda widget: restore_batched(widget, text, style_runs))
+    root.destroy()
+    print(f"样式段数量: {run_count}，文本字符数: {len(text)}")
+    print(f"逐范围恢复: {before * 1000:8.1f} ms，标签数 {before_tags}")
+    print(f"批量恢复:   {after * 1000:8.1f} ms，标签数 {after_tags}")
+    if after > 0:
+        print(f"加速: {before / after:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,12 +5,29 @@ from tkinter.scrolledtext import ScrolledText
 import re
 import json
 import base64
-from io import BytesIO
+import struct
+import hashlib
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor
+import zlib
+import lzma
+import bz2
+import gzip
+from io import BytesIO, IncrementalNewlineDecoder
+import codecs
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
 try:
     from ctypes import windll
     WINDOWS_API_AVAILABLE = True
 except ImportError:
     WINDOWS_API_AVAILABLE = False
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+    import fcntl
 try:
     from PIL import Image, ImageTk
     PIL_AVAILABLE = True
@@ -24,6 +41,1035 @@ except ImportError:
         print("自动安装 Pillow 失败，请手动安装: pip install pillow")
         PIL_AVAILABLE = False
 
+# ==================== 项目文件容器（.rtep 2.0） ====================
+# 文件结构：文件头 | 标签页块/图片块... | 清单块 | 文件尾
+#   文件头：b'RTEP' + 容器版本(uint16) + 保留(uint16)
+#   数据块：类型(4字节) + 编码(1字节) + 保留(3字节) + 数据长度(uint64) + 数据
+#   文件尾：b'RTOC' + 清单块偏移(uint64)
+# 清单为JSON，记录项目信息、各标签页元数据（标题、颜色、字数、图片引用）及其数据块位置；
+# 只读清单即可列出标签页（见 peek_project_file）。图片以原始字节存放，不再使用base64
+# 标签页块与清单块可按设置压缩（编码字节记录所用算法），图片本身已是压缩格式，始终原样存放
+
+PROJECT_MAGIC = b'RTEP'
+PROJECT_CONTAINER_VERSION = 2
+PROJECT_HEADER = struct.Struct('<4sHH')
+CHUNK_HEADER = struct.Struct('<4sB3xQ')
+PROJECT_TRAILER = struct.Struct('<4sQ')
+TRAILER_MAGIC = b'RTOC'
+
+CHUNK_TAB = b'TABD'  # 单个标签页的文本、格式与图片引用
+CHUNK_IMAGE = b'IMAG'  # 图片原始字节（按内容哈希去重，每张只写一次）
+CHUNK_MANIFEST = b'MANI'  # 项目清单
+
+CODEC_RAW = 0  # 数据未压缩
+CODEC_ZLIB = 1
+CODEC_LZMA = 2
+CODEC_BZ2 = 3
+
+# 设置中的压缩方式 -> 数据块编码
+COMPRESSION_CODECS = {'none': CODEC_RAW, 'zlib': CODEC_ZLIB, 'lzma': CODEC_LZMA, 'bz2': CODEC_BZ2}
+
+STREAM_BLOCK_SIZE = 64 * 1024  # 流式读取压缩数据时每次读取的字节数
+
+# 清单中记录的标签页元数据字段，其余字段写入标签页数据块
+TAB_MANIFEST_KEYS = ('id', 'title', 'filename', 'modified', 'cursor_pos', 'custom_color')
+
+
+def image_digest(image_bytes):
+    """计算图片编码数据的内容哈希"""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+# 图片在编辑器中的最大显示尺寸；文件中保存原始图片，显示用的缩小图在加载时生成
+IMAGE_DISPLAY_MAX_SIZE = (400, 300)
+# 可直接保存原始文件字节的格式，其余格式以原始分辨率转为PNG保存
+IMAGE_PASSTHROUGH_FORMATS = ('JPEG', 'PNG', 'GIF')
+
+
+def display_size(width, height):
+    """按最大显示尺寸等比缩小后的尺寸（不放大）"""
+    max_width, max_height = IMAGE_DISPLAY_MAX_SIZE
+    scale_ratio = min(max_width / width, max_height / height, 1.0)
+    return max(1, int(width * scale_ratio)), max(1, int(height * scale_ratio))
+
+
+def decode_image_bytes(image_bytes):
+    """解码图片编码数据为显示尺寸的PIL图片（在线程池中调用，PIL解码时会释放GIL）"""
+    image = Image.open(BytesIO(image_bytes))
+    target_size = display_size(*image.size)
+    if image.format == 'JPEG':
+        # JPEG可在解码时直接按比例缩小，减少解码量
+        image.draft(image.mode, target_size)
+    image.load()
+    if image.size != target_size:
+        image = image.resize(target_size, Image.Resampling.LANCZOS)
+    return image
+
+
+def storable_image_bytes(file_path):
+    """读取图片文件，返回要保存到文档中的编码字节
+
+    JPEG/PNG/GIF 原样保留文件字节；其他格式（如BMP、TIFF）以原始分辨率转为PNG
+    """
+    with open(file_path, 'rb') as file:
+        image_bytes = file.read()
+    image = Image.open(BytesIO(image_bytes))
+    if image.format in IMAGE_PASSTHROUGH_FORMATS:
+        return image_bytes
+    buffer = BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def make_compressor(codec, level):
+    """创建数据块编码对应的流式压缩器，level 为 0-9"""
+    if codec == CODEC_ZLIB:
+        return zlib.compressobj(level)
+    if codec == CODEC_LZMA:
+        return lzma.LZMACompressor(preset=level)
+    if codec == CODEC_BZ2:
+        return bz2.BZ2Compressor(max(1, level))
+    raise ValueError(f"不支持的数据块编码: {codec}")
+
+
+def make_decompressor(codec):
+    """创建数据块编码对应的流式解压器"""
+    if codec == CODEC_ZLIB:
+        return zlib.decompressobj()
+    if codec == CODEC_LZMA:
+        return lzma.LZMADecompressor()
+    if codec == CODEC_BZ2:
+        return bz2.BZ2Decompressor()
+    raise ValueError(f"不支持的数据块编码: {codec}")
+
+
+def write_chunk(file, kind, payload, codec=CODEC_RAW):
+    """写入一个未压缩数据块，返回 [块偏移, 数据长度]"""
+    offset = file.tell()
+    file.write(CHUNK_HEADER.pack(kind, codec, len(payload)))
+    file.write(payload)
+    return [offset, len(payload)]
+
+
+def write_json_chunk(file, kind, value, codec=CODEC_RAW, level=6):
+    """将JSON数据边编码边压缩地写入一个数据块，返回 [块偏移, 数据长度]
+
+    先写入占位块头，数据写完后再回填实际长度，不需要在内存中拼出完整的数据
+    """
+    offset = file.tell()
+    file.write(CHUNK_HEADER.pack(kind, codec, 0))
+    compressor = make_compressor(codec, level) if codec != CODEC_RAW else None
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for piece in encoder.iterencode(value):
+        data = piece.encode('utf-8')
+        file.write(compressor.compress(data) if compressor else data)
+    if compressor:
+        file.write(compressor.flush())
+    end = file.tell()
+    length = end - offset - CHUNK_HEADER.size
+    file.seek(offset)
+    file.write(CHUNK_HEADER.pack(kind, codec, length))
+    file.seek(end)
+    return [offset, length]
+
+
+def copy_chunk(source, target, location, expected_kind):
+    """将数据块原样（保持压缩编码）复制到另一个文件，返回新位置"""
+    offset, length = location
+    source.seek(offset)
+    header = source.read(CHUNK_HEADER.size)
+    kind, codec, stored_length = CHUNK_HEADER.unpack(header) if len(header) == CHUNK_HEADER.size else (None, 0, 0)
+    if kind != expected_kind or stored_length != length:
+        raise ValueError(f"项目文件已损坏：数据块类型不匹配 ({kind!r})")
+    new_offset = target.tell()
+    target.write(header)
+    remaining = length
+    while remaining:
+        data = source.read(min(remaining, STREAM_BLOCK_SIZE))
+        if not data:
+            raise ValueError("项目文件已损坏：数据块被截断")
+        target.write(data)
+        remaining -= len(data)
+    return [new_offset, length]
+
+
+def read_chunk(file, location, expected_kind):
+    """按 [块偏移, 数据长度] 读取一个数据块"""
+    offset, length = location
+    file.seek(offset)
+    header = file.read(CHUNK_HEADER.size)
+    if len(header) < CHUNK_HEADER.size:
+        raise ValueError("项目文件已损坏：数据块不完整")
+    kind, codec, stored_length = CHUNK_HEADER.unpack(header)
+    if kind != expected_kind or stored_length != length:
+        raise ValueError(f"项目文件已损坏：数据块类型不匹配 ({kind!r})")
+    if codec == CODEC_RAW:
+        payload = file.read(length)
+        if len(payload) < length:
+            raise ValueError("项目文件已损坏：数据块被截断")
+        return payload
+
+    # 压缩数据块分段读取并解压
+    decompressor = make_decompressor(codec)
+    parts = []
+    remaining = length
+    while remaining:
+        data = file.read(min(remaining, STREAM_BLOCK_SIZE))
+        if not data:
+            raise ValueError("项目文件已损坏：数据块被截断")
+        parts.append(decompressor.decompress(data))
+        remaining -= len(data)
+    if codec == CODEC_ZLIB:
+        parts.append(decompressor.flush())
+    return b''.join(parts)
+
+
+def is_project_container(file_path):
+    """判断文件是否为分块容器格式的项目文件"""
+    with open(file_path, 'rb') as file:
+        return file.read(len(PROJECT_MAGIC)) == PROJECT_MAGIC
+
+
+def chunk_span(location):
+    """数据块在文件中占用的字节数（含块头）"""
+    return CHUNK_HEADER.size + location[1]
+
+
+def write_manifest_and_trailer(file, manifest, codec=CODEC_RAW, level=6):
+    """写入清单块与文件尾并落盘，返回清单块位置"""
+    manifest_location = write_json_chunk(file, CHUNK_MANIFEST, manifest, codec, level)
+    file.write(PROJECT_TRAILER.pack(TRAILER_MAGIC, manifest_location[0]))
+    file.flush()
+    os.fsync(file.fileno())
+    return manifest_location
+
+
+def build_container_layout(file_path, manifest, manifest_location, file_size, revisions=None):
+    """根据清单生成文件布局：各标签页/图片的数据块位置、文件大小与有效数据大小
+
+    布局用于追加日志模式判断哪些数据块可以沿用，revisions 为 标签页id -> 写入时的修订号
+    """
+    revisions = revisions or {}
+    live_bytes = PROJECT_HEADER.size + chunk_span(manifest_location) + PROJECT_TRAILER.size
+    live_bytes += sum(chunk_span(location) for location in manifest.get('images', {}).values())
+    live_bytes += sum(chunk_span(tab_meta['chunk']) for tab_meta in manifest.get('tabs', []))
+    return {
+        'file_path': file_path,
+        'file_size': file_size,
+        'live_bytes': live_bytes,
+        'tabs': {tab_meta['id']: {'revision': revisions.get(tab_meta['id'], 0), 'chunk': tab_meta['chunk']}
+                 for tab_meta in manifest.get('tabs', [])},
+        'images': dict(manifest.get('images', {}))
+    }
+
+
+def write_project_container(file_path, project_data, progress=None, journal_layout=None,
+                            codec=CODEC_RAW, level=6):
+    """将项目数据写入分块容器文件，返回写入后的文件布局
+
+    project_data 与旧版导出结构相同，但图片条目以 'image_ref' 引用
+    project_data['image_store'] 中按内容哈希存放的原始字节；标签页的 'revision' 只用于布局，不写入文件。
+    journal_layout 为该文件上次写入后的布局时以追加日志方式写入：修订号未变的标签页和已有图片沿用原数据块，
+    只在文件末尾追加变化的数据块、新清单与新文件尾。
+    codec/level 为标签页块与清单块的压缩方式；沿用的旧数据块保持原有编码。
+    progress(已写入块数, 总块数) 在每写完一个数据块后回调
+    """
+    image_store = project_data.get('image_store', {})
+    tabs = project_data.get('tabs', [])
+    known_tabs = journal_layout['tabs'] if journal_layout else {}
+    known_images = journal_layout['images'] if journal_layout else {}
+
+    def tab_unchanged(tab):
+        known = known_tabs.get(tab.get('id'))
+        return known is not None and known['revision'] == tab.get('revision', 0)
+
+    total_chunks = (sum(1 for image_hash in image_store if image_hash not in known_images)
+                    + sum(1 for tab in tabs if not tab_unchanged(tab)) + 1)
+    written_chunks = 0
+
+    with open(file_path, 'r+b' if journal_layout else 'wb') as file:
+        if journal_layout:
+            # 丢弃上次完整写入之后可能残留的半截数据，从最后一个文件尾之后追加
+            file.truncate(journal_layout['file_size'])
+            file.seek(journal_layout['file_size'])
+        else:
+            file.write(PROJECT_HEADER.pack(PROJECT_MAGIC, PROJECT_CONTAINER_VERSION, 0))
+
+        manifest = {key: value for key, value in project_data.items() if key not in ('tabs', 'image_store')}
+        manifest['version'] = '2.0'
+        manifest['images'] = {}
+        manifest['tabs'] = []
+        revisions = {}
+
+        # 每张不同的图片只写入一个数据块，标签页通过哈希引用
+        for image_hash, image_bytes in image_store.items():
+            if image_hash in known_images:
+                manifest['images'][image_hash] = known_images[image_hash]
+                continue
+            manifest['images'][image_hash] = write_chunk(file, CHUNK_IMAGE, image_bytes)
+            written_chunks += 1
+            if progress:
+                progress(written_chunks, total_chunks)
+
+        for tab in tabs:
+            tab_meta = {key: tab.get(key) for key in TAB_MANIFEST_KEYS}
+            # 供预览使用的大小信息，无需读取标签页数据块
+            tab_meta['chars'] = len(tab.get('content', ''))
+            tab_meta['image_refs'] = sorted({img.get('image_ref') for img in tab.get('images', [])
+                                             if img.get('image_ref')})
+            revisions[tab.get('id')] = tab.get('revision', 0)
+            if tab_unchanged(tab):
+                tab_meta['chunk'] = known_tabs[tab.get('id')]['chunk']
+                manifest['tabs'].append(tab_meta)
+                continue
+
+            tab_payload = {key: value for key, value in tab.items()
+                           if key not in TAB_MANIFEST_KEYS and key != 'revision'}
+            tab_meta['chunk'] = write_json_chunk(file, CHUNK_TAB, tab_payload, codec, level)
+            manifest['tabs'].append(tab_meta)
+            written_chunks += 1
+            if progress:
+                progress(written_chunks, total_chunks)
+
+        # 清单写在最后，文件尾记录其位置
+        manifest_location = write_manifest_and_trailer(file, manifest, codec, level)
+        file_size = file.tell()
+        if progress:
+            progress(total_chunks, total_chunks)
+
+    return build_container_layout(file_path, manifest, manifest_location, file_size, revisions)
+
+
+def write_project_file_atomic(file_path, project_data, progress=None, codec=CODEC_RAW, level=6):
+    """先写入同目录临时文件再替换目标文件，写入中途崩溃不会留下截断的项目，返回文件布局"""
+    temp_path = file_path + '.tmp'
+    try:
+        layout = write_project_container(temp_path, project_data, progress, codec=codec, level=level)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    layout['file_path'] = file_path
+    return layout
+
+
+def journal_needs_compaction(layout, ratio, min_bytes):
+    """追加日志中的失效数据超过阈值时需要压实"""
+    return layout['file_size'] >= min_bytes and layout['file_size'] > layout['live_bytes'] * ratio
+
+
+def compact_project_file(file_path, layout, codec=CODEC_RAW, level=6):
+    """将追加日志压实为只含有效数据块的完整快照（临时文件 + os.replace），返回新布局
+
+    数据块按原编码直接复制，不重新解压压缩
+    """
+    temp_path = file_path + '.tmp'
+    revisions = {tab_id: entry['revision'] for tab_id, entry in layout['tabs'].items()}
+    try:
+        with open(file_path, 'rb') as source, open(temp_path, 'wb') as target:
+            manifest = read_project_manifest(source)
+            target.write(PROJECT_HEADER.pack(PROJECT_MAGIC, PROJECT_CONTAINER_VERSION, 0))
+            for image_hash, location in manifest.get('images', {}).items():
+                manifest['images'][image_hash] = copy_chunk(source, target, location, CHUNK_IMAGE)
+            for tab_meta in manifest.get('tabs', []):
+                tab_meta['chunk'] = copy_chunk(source, target, tab_meta['chunk'], CHUNK_TAB)
+            manifest_location = write_manifest_and_trailer(target, manifest, codec, level)
+            file_size = target.tell()
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    return build_container_layout(file_path, manifest, manifest_location, file_size, revisions)
+
+
+def find_last_manifest(file):
+    """文件尾损坏时（如追加过程中崩溃）顺序扫描数据块，返回最后一个能完整解码的清单及其位置 (清单, 位置)
+
+    写入中断的清单块（长度为 0 的占位块头，或数据不完整）被跳过，退回到之前的清单
+    """
+    file.seek(0, os.SEEK_END)
+    file_size = file.tell()
+    position = PROJECT_HEADER.size
+    manifests = []
+    while position + len(TRAILER_MAGIC) <= file_size:
+        file.seek(position)
+        if file.read(len(TRAILER_MAGIC)) == TRAILER_MAGIC:
+            position += PROJECT_TRAILER.size
+            continue
+        file.seek(position)
+        header = file.read(CHUNK_HEADER.size)
+        if len(header) < CHUNK_HEADER.size:
+            break
+        kind, _, length = CHUNK_HEADER.unpack(header)
+        if kind not in (CHUNK_TAB, CHUNK_IMAGE, CHUNK_MANIFEST) or position + chunk_span([position, length]) > file_size:
+            break
+        if kind == CHUNK_MANIFEST and length:
+            manifests.append([position, length])
+        position += chunk_span([position, length])
+    for location in reversed(manifests):
+        try:
+            manifest = json.loads(read_chunk(file, location, CHUNK_MANIFEST).decode('utf-8'))
+        except (ValueError, OSError, zlib.error, lzma.LZMAError):
+            continue
+        if isinstance(manifest, dict):
+            return manifest, location
+    raise ValueError("项目文件已损坏：找不到项目清单")
+
+
+def read_project_manifest(file, with_location=False):
+    """读取已打开容器文件的清单，with_location 为真时同时返回清单块位置"""
+    file.seek(0)
+    magic, version, _ = PROJECT_HEADER.unpack(file.read(PROJECT_HEADER.size))
+    if magic != PROJECT_MAGIC:
+        raise ValueError("不是有效的项目文件")
+    if version > PROJECT_CONTAINER_VERSION:
+        raise ValueError(f"项目文件版本过新: {version}")
+
+    manifest = None
+    try:
+        file.seek(-PROJECT_TRAILER.size, os.SEEK_END)
+        trailer_magic, manifest_offset = PROJECT_TRAILER.unpack(file.read(PROJECT_TRAILER.size))
+        if trailer_magic == TRAILER_MAGIC:
+            file.seek(manifest_offset)
+            header = file.read(CHUNK_HEADER.size)
+            if len(header) == CHUNK_HEADER.size:
+                manifest_location = [manifest_offset, CHUNK_HEADER.unpack(header)[2]]
+                manifest = json.loads(read_chunk(file, manifest_location, CHUNK_MANIFEST).decode('utf-8'))
+    except (ValueError, OSError, struct.error, zlib.error, lzma.LZMAError):
+        # 文件尾完好但指向的不是完整清单（如原地追加中断），按无文件尾处理
+        manifest = None
+    if manifest is None:
+        manifest, manifest_location = find_last_manifest(file)
+    if with_location:
+        return manifest, manifest_location
+    return manifest
+
+
+def read_project_container(file_path, tab_ids=None):
+    """读取分块容器文件，返回项目数据
+
+    图片原始字节放在 'image_store' 中，'layout' 为供追加日志模式沿用的文件布局。
+    tab_ids 不为空时只读取这些标签页及其引用的图片，此时不返回布局
+    """
+    with open(file_path, 'rb') as file:
+        manifest, manifest_location = read_project_manifest(file, with_location=True)
+
+        tabs = []
+        used_images = set()
+        for tab_meta in manifest.get('tabs', []):
+            if tab_ids is not None and tab_meta.get('id') not in tab_ids:
+                continue
+            tab = {key: value for key, value in tab_meta.items() if key not in ('chunk', 'chars', 'image_refs')}
+            tab.update(json.loads(read_chunk(file, tab_meta['chunk'], CHUNK_TAB).decode('utf-8')))
+            used_images.update(img.get('image_ref') for img in tab.get('images', []))
+            tabs.append(tab)
+
+        image_store = {}
+        for image_hash, location in manifest.get('images', {}).items():
+            if tab_ids is not None and image_hash not in used_images:
+                continue
+            image_store[image_hash] = read_chunk(file, location, CHUNK_IMAGE)
+
+        # 追加日志从最后一个完整清单及其文件尾之后继续写入
+        file.seek(0, os.SEEK_END)
+        file_size = min(file.tell(), manifest_location[0] + chunk_span(manifest_location) + PROJECT_TRAILER.size)
+
+    project_data = {key: value for key, value in manifest.items() if key not in ('tabs', 'images')}
+    project_data['tabs'] = tabs
+    project_data['image_store'] = image_store
+    if tab_ids is None:
+        project_data['layout'] = build_container_layout(file_path, manifest, manifest_location, file_size)
+    else:
+        project_data['current_tab_index'] = 0
+    return project_data
+
+
+def load_project_data(file_path, tab_ids=None):
+    """读取 .rtep 文件，自动识别分块容器与（可能经过压缩的）旧版 JSON 格式
+
+    tab_ids 不为空时只保留这些标签页
+    """
+    if is_project_container(file_path):
+        return read_project_container(file_path, tab_ids)
+    with open_text_file(file_path) as file:
+        project_data = json.load(file)
+    if tab_ids is not None:
+        project_data['tabs'] = [tab for tab in project_data.get('tabs', []) if tab.get('id') in tab_ids]
+        project_data['current_tab_index'] = 0
+    return project_data
+
+
+def peek_project_file(file_path):
+    """只读取项目清单，快速列出标签页而不加载正文与图片
+
+    返回 {'project_name', 'current_tab_index', 'tabs': [{'id', 'title', 'custom_color',
+    'chars', 'image_count', 'bytes'}]}；bytes 为标签页数据块与其引用图片在文件中占用的字节数。
+    旧版 JSON 项目没有清单，只能完整读取后统计
+    """
+    if is_project_container(file_path):
+        with open(file_path, 'rb') as file:
+            manifest = read_project_manifest(file)
+        images = manifest.get('images', {})
+        tabs = []
+        for tab_meta in manifest.get('tabs', []):
+            # 早期 2.0 清单中没有 chars/image_refs
+            image_refs = tab_meta.get('image_refs', [])
+            tabs.append({
+                'id': tab_meta.get('id'),
+                'title': tab_meta.get('title'),
+                'custom_color': tab_meta.get('custom_color'),
+                'chars': tab_meta.get('chars'),
+                'image_count': len(image_refs),
+                'bytes': tab_meta['chunk'][1] + sum(images[ref][1] for ref in image_refs if ref in images)
+            })
+    else:
+        with open_text_file(file_path) as file:
+            manifest = json.load(file)
+        tabs = []
+        for tab in manifest.get('tabs', []):
+            image_refs = {img.get('image_ref') or img.get('image_data') for img in tab.get('images', [])}
+            tabs.append({
+                'id': tab.get('id'),
+                'title': tab.get('title'),
+                'custom_color': tab.get('custom_color'),
+                'chars': len(tab.get('content', '')),
+                'image_count': len(image_refs),
+                'bytes': len(json.dumps(tab, ensure_ascii=False).encode('utf-8'))
+            })
+    return {
+        'project_name': manifest.get('project_name'),
+        'current_tab_index': manifest.get('current_tab_index', 0),
+        'tabs': tabs
+    }
+
+# ==================== 压缩的 JSON 文件（.rted） ====================
+# 整个文件经 gzip / xz / bz2 流式压缩，打开时按文件开头的魔数自动识别
+
+COMPRESSED_FILE_OPENERS = (
+    (b'\x1f\x8b', gzip.open),
+    (b'\xfd7zXZ\x00', lzma.open),
+    (b'BZh', bz2.open),
+)
+
+
+def open_text_file(file_path):
+    """以UTF-8文本方式打开文件，按魔数识别压缩格式并流式解压"""
+    with open(file_path, 'rb') as file:
+        magic = file.read(6)
+    for prefix, opener in COMPRESSED_FILE_OPENERS:
+        if magic.startswith(prefix):
+            return opener(file_path, 'rt', encoding='utf-8')
+    return open(file_path, 'r', encoding='utf-8')
+
+
+def create_text_file(file_path, compression='none', level=6):
+    """以UTF-8文本方式创建文件，写入的内容流式经过所选压缩器（zlib 使用 gzip 封装以便识别）"""
+    if compression == 'zlib':
+        return gzip.open(file_path, 'wt', compresslevel=level, encoding='utf-8')
+    if compression == 'lzma':
+        return lzma.open(file_path, 'wt', preset=level, encoding='utf-8')
+    if compression == 'bz2':
+        return bz2.open(file_path, 'wt', compresslevel=max(1, level), encoding='utf-8')
+    return open(file_path, 'w', encoding='utf-8')
+
+# ==================== 编辑器设置 ====================
+
+SETTINGS_FILE = 'editor_settings.json'
+DEFAULT_SETTINGS = {
+    'project_journal': False,  # 项目以追加日志方式增量保存
+    'journal_compact_ratio': 2.0,  # 文件大小超过有效数据的倍数时压实日志
+    'journal_compact_min_bytes': 1024 * 1024,  # 小于该大小的项目文件不压实
+    'autosave_enabled': True,  # 在后台写入崩溃恢复快照
+    'autosave_delay_ms': 3000,  # 停止输入多久后写入恢复快照
+    'compression': 'none',  # .rted/.rtep 的压缩方式：none / zlib / lzma / bz2
+    'compression_level': 6,  # 压缩级别 0-9
+    'text_pool_size': 8,  # 最多为多少个最近使用的标签页保留文本组件
+    'text_pool_max_chars': 2000000,  # 保留的文本组件总字数上限，超出时释放最久未使用的
+    'hibernate_after_minutes': 15,  # 标签页多久未激活后进入休眠，0 表示不休眠
+}
+
+HIBERNATE_CHECK_MS = 60 * 1000  # 检查空闲标签页的间隔
+
+# 标签栏中每个标签页按钮占用的高度（像素），窗口尚未显示时按默认数量渲染
+TAB_SLOT_HEIGHT = 26
+TAB_STRIP_DEFAULT_SLOTS = 12
+
+# 快速切换标签页：索引每个标签页正文的前若干字符，最多显示的结果数
+TAB_INDEX_PREFIX_CHARS = 2000
+QUICK_SWITCH_MAX_RESULTS = 50
+
+# 文字格式标签：样式注册表的共享标签 style_N，以及旧版本每次操作单独创建的标签
+FORMAT_TAG_PREFIXES = ('style_', 'color_', 'size_', 'font_', 'underline', 'format_')
+STYLE_ATTRIBUTES = ('foreground', 'font', 'underline')
+
+# 超过此字符数的文本（打开的文件、粘贴的内容）分片插入，每片之间让界面处理事件
+LARGE_INSERT_CHARS = 1024 * 1024
+INSERT_CHUNK_CHARS = 256 * 1024
+
+
+def read_text_chunks(file_path, block_size=INSERT_CHUNK_CHARS):
+    """逐块读取 UTF-8 文本文件，换行统一为 \\n，产出 (文本片段, 已读取字节数)"""
+    decoder = IncrementalNewlineDecoder(codecs.getincrementaldecoder('utf-8')(), translate=True)
+    read_bytes = 0
+    with open(file_path, 'rb') as file:
+        while True:
+            block = file.read(block_size)
+            read_bytes += len(block)
+            text = decoder.decode(block, final=not block)
+            if text:
+                yield text, read_bytes
+            if not block:
+                break
+
+
+def split_text_chunks(text, size=INSERT_CHUNK_CHARS):
+    """将字符串切成片段，产出 (文本片段, 已切出字符数)"""
+    for start in range(0, len(text), size):
+        yield text[start:start + size], min(start + size, len(text))
+
+
+# 富文本剪贴板内容的开头（json.dumps 保持键的顺序），不以此开头的剪贴板文本直接按纯文本粘贴，不必尝试解析
+RICH_CLIPBOARD_PREFIX = '{"__richtext__": true'
+
+# Python 语法高亮：按行分词，跨行的三引号字符串在行尾换行符上打不可见的状态标签，增量高亮时据此判断何时停止
+SYNTAX_TAGS = ('keyword', 'string', 'comment', 'function', 'number')
+SYNTAX_STATE_TAGS = {'"""': 'triple_dq', "'''": 'triple_sq'}
+SYNTAX_WORD_PATTERNS = (
+    (re.compile(r'\b(False|None|True|and|as|assert|async|await|break|class|continue|def|del|elif|else|except|finally|for|from|global|if|import|in|is|lambda|nonlocal|not|or|pass|raise|return|try|while|with|yield)\b'), 'keyword'),
+    (re.compile(r'\b[A-Za-z_][A-Za-z0-9_]*(?=\s*\()'), 'function'),
+    (re.compile(r'\b\d+\b'), 'number'),
+)
+SYNTAX_LEXEME = re.compile(r'#|"""|\'\'\'|"|\'')
+SYNTAX_SHORT_STRINGS = {'"': re.compile(r'"(?:\\.|[^"\\])*"?'), "'": re.compile(r"'(?:\\.|[^'\\])*'?")}
+# 增量高亮向后延伸时，每次至少多处理的行数
+SYNTAX_EXTEND_LINES = 50
+
+
+def tokenize_python_line(line, state=None):
+    """对一行 Python 代码分词，state 为上一行结束时未闭合的三引号（没有则为 None）
+
+    返回 ([(起点列, 终点列, 标签), ...], 本行结束时的状态)；未闭合的三引号字符串包含行尾换行符，
+    并在换行符上加状态标签
+    """
+    spans = []
+    for pattern, tag in SYNTAX_WORD_PATTERNS:
+        spans.extend((match.start(), match.end(), tag) for match in pattern.finditer(line))
+
+    position = 0
+    if state:
+        close = line.find(state)
+        if close < 0:
+            spans.append((0, len(line) + 1, 'string'))
+            spans.append((len(line), len(line) + 1, SYNTAX_STATE_TAGS[state]))
+            return spans, state
+        position = close + 3
+        spans.append((0, position, 'string'))
+        state = None
+    while True:
+        match = SYNTAX_LEXEME.search(line, position)
+        if not match:
+            break
+        token, start = match.group(), match.start()
+        if token == '#':
+            spans.append((start, len(line), 'comment'))
+            break
+        if len(token) == 3:
+            close = line.find(token, match.end())
+            if close < 0:
+                state = token
+                spans.append((start, len(line) + 1, 'string'))
+                spans.append((len(line), len(line) + 1, SYNTAX_STATE_TAGS[state]))
+                break
+            position = close + 3
+        else:
+            # 单引号字符串不跨行，没有闭合引号时到行尾为止
+            position = SYNTAX_SHORT_STRINGS[token].match(line, start).end()
+        spans.append((start, position, 'string'))
+    return spans, state
+
+
+def text_index_key(index):
+    """将 Tk 文本索引 'line.col' 转换为可比较的 (行, 列)"""
+    line, column = str(index).split('.')
+    return int(line), int(column)
+
+
+class LineIndex:
+    """文本的行首偏移表，在 Tk 索引 'line.col' 与文本字符偏移之间换算
+
+    embedded 为嵌入对象（图片、行号组件）的 Tk 索引：它们在 Tk 索引中占一个字符，但不出现在文本中。
+    编辑后 starts[shift_from:] 的实际值还需加上 shift，连续在相近位置编辑时不必改写其后的全部行首
+    """
+
+    def __init__(self, text, embedded=()):
+        self.starts = [0]
+        self.starts.extend(accumulate(len(line) + 1 for line in text.split('\n')))
+        self.starts.pop()
+        self.shift_from = len(self.starts)
+        self.shift = 0
+        self.embedded = {}  # 行号 -> 该行嵌入对象的 Tk 列号（升序）
+        for index in embedded:
+            line, column = text_index_key(index)
+            self.embedded.setdefault(line, []).append(column)
+        for columns in self.embedded.values():
+            columns.sort()
+
+    def line_start(self, line):
+        """第 line 行（从 1 开始）行首的文本偏移"""
+        if line - 1 >= self.shift_from:
+            return self.starts[line - 1] + self.shift
+        return self.starts[line - 1]
+
+    def offset(self, index):
+        """Tk 索引 -> 文本字符偏移"""
+        line, column = text_index_key(index)
+        line = min(line, len(self.starts))
+        columns = self.embedded.get(line)
+        if columns:
+            column -= bisect_left(columns, column)
+        return self.line_start(line) + column
+
+    def move_shift(self, position):
+        """将待加偏移的起点移到 starts[position]，只改写两者之间的行首"""
+        if self.shift and position > self.shift_from:
+            self.starts[self.shift_from:position] = [start + self.shift for start in self.starts[self.shift_from:position]]
+        elif self.shift and position < self.shift_from:
+            self.starts[position:self.shift_from] = [start - self.shift for start in self.starts[position:self.shift_from]]
+        self.shift_from = position
+
+    def edit(self, start, end, inserted):
+        """Tk 索引 start 到 end 之间的内容（文本与嵌入对象）被替换为 inserted 后更新；插入时 start 与 end 相同"""
+        offset = self.offset(start)
+        delta = len(inserted) - (self.offset(end) - offset)
+        start_line, start_column = text_index_key(start)
+        end_line, end_column = text_index_key(end)
+        self.move_shift(start_line)
+        # starts[start_line:] 存放的是实际值减去 shift，新插入的行首按编辑后的 shift 存放
+        base = offset + 1 - self.shift - delta
+        new_starts = []
+        position = inserted.find('\n')
+        while position >= 0:
+            new_starts.append(base + position)
+            position = inserted.find('\n', position + 1)
+        self.starts[start_line:end_line] = new_starts
+        self.shift += delta
+        if self.embedded:
+            self.edit_embedded(start_line, start_column, end_line, end_column, inserted)
+
+    def edit_embedded(self, start_line, start_column, end_line, end_column, inserted):
+        """编辑后移动嵌入对象：范围内的随删除的内容移除，终点之后的移到插入的文本之后，其后各行的行号随换行数变化"""
+        line_count = inserted.count('\n')
+        last_length = len(inserted) - inserted.rfind('\n') - 1
+        line_delta = line_count - (end_line - start_line)
+        if line_delta:
+            lines = list(self.embedded)
+        else:
+            lines = [line for line in range(start_line, end_line + 1) if line in self.embedded]
+        moved = {}
+        for line in lines:
+            if line < start_line:
+                continue
+            columns = self.embedded.pop(line)
+            if line > end_line:
+                moved[line + line_delta] = columns
+                continue
+            if line == start_line:
+                kept = [column for column in columns if column < start_column]
+                if kept:
+                    moved.setdefault(start_line, []).extend(kept)
+            if line == end_line:
+                new_column = last_length + (start_column if not line_count else 0) - end_column
+                tail = [column + new_column for column in columns if column >= end_column]
+                if tail:
+                    moved.setdefault(start_line + line_count, []).extend(tail)
+        for line in (start_line, start_line + line_count):
+            if line in moved:
+                moved[line].sort()
+        self.embedded.update(moved)
+
+    def embed(self, index):
+        """在 Tk 索引处插入了嵌入对象：同一行其后的嵌入对象列号加一"""
+        line, column = text_index_key(index)
+        columns = self.embedded.setdefault(line, [])
+        position = bisect_left(columns, column)
+        columns[position:] = [embedded_column + 1 for embedded_column in columns[position:]]
+        columns.insert(position, column)
+
+    def find_line(self, offset):
+        """文本字符偏移所在的行号（从 1 开始）"""
+        if self.shift_from < len(self.starts) and offset >= self.starts[self.shift_from] + self.shift:
+            return bisect_right(self.starts, offset - self.shift, self.shift_from)
+        return bisect_right(self.starts, offset, 0, self.shift_from)
+
+    def index(self, offset):
+        """文本字符偏移 -> Tk 索引"""
+        line = self.find_line(offset)
+        column = offset - self.line_start(line)
+        for embedded_column in self.embedded.get(line, ()):
+            if embedded_column > column:
+                break
+            column += 1
+        return '%d.%d' % (line, column)
+
+
+def add_tag_ranges(text_widget, tag_name, indices):
+    """用一次 Tcl 调用为标签添加多个范围，indices 为 [起点, 终点, 起点, 终点, ...]"""
+    if indices:
+        text_widget.tk.call(text_widget._w, 'tag', 'add', tag_name, *indices)
+
+
+def add_style_run_tags(text_widget, style_runs, tags, line_index):
+    """按样式批量添加样式段的标签：tags[样式表下标] 为已配置的标签名（None 表示跳过），每种样式一次 tag add"""
+    batches = {}  # 样式表下标 -> [起点, 终点, ...]
+    for i in range(0, len(style_runs) - 2, 3):
+        start, length, position = style_runs[i:i + 3]
+        if 0 <= position < len(tags) and tags[position]:
+            batches.setdefault(position, []).extend(
+                (line_index.index(start), line_index.index(start + length)))
+    for position, indices in batches.items():
+        add_tag_ranges(text_widget, tags[position], indices)
+
+
+def coalesce_runs(spans):
+    """合并相同样式的相邻或重叠区间 (起点, 终点, 样式id)，返回按样式分组、组内按位置排序的最少区间列表
+
+    各样式按首次出现的顺序输出，空区间被丢弃
+    """
+    groups = {}
+    for start, end, style_id in spans:
+        if start < end:
+            groups.setdefault(style_id, []).append((start, end))
+
+    merged = []
+    for style_id, ranges in groups.items():
+        ranges.sort()
+        run_start, run_end = ranges[0]
+        for start, end in ranges[1:]:
+            if start <= run_end:
+                run_end = max(run_end, end)
+                continue
+            merged.append((run_start, run_end, style_id))
+            run_start, run_end = start, end
+        merged.append((run_start, run_end, style_id))
+    return merged
+
+
+class StyleRuns:
+    """按样式分组的有序样式段，同一样式的区间互不重叠，查询与某个范围相交的格式只需二分查找
+
+    spans 为 coalesce_runs 的结果 (起点, 终点, 样式id)。文本编辑时按 Tk 标签的规则移动或拆分区间，
+    与 LineIndex 一样，编辑位置之后的区间只记录待加的偏移，不逐个改写
+    """
+
+    def __init__(self, spans):
+        self.runs = {}  # 样式id -> [[起点...], [终点...], shift_from, shift]，下标 shift_from 起的实际值还需加 shift
+        for start, end, style_id in spans:
+            run = self.runs.setdefault(style_id, [[], [], 0, 0])
+            run[0].append(start)
+            run[1].append(end)
+
+    @staticmethod
+    def bisect_run(run, values, offset, right=True):
+        """在 run 的起点或终点列表（实际值升序）中二分查找 offset"""
+        search = bisect_right if right else bisect_left
+        shift_from, shift = run[2], run[3]
+        position = search(values, offset, 0, shift_from)
+        if position < shift_from:
+            return position
+        return search(values, offset - shift, shift_from)
+
+    @staticmethod
+    def bounds(run, i):
+        """第 i 个区间的实际 (起点, 终点)"""
+        shift = run[3] if i >= run[2] else 0
+        return run[0][i] + shift, run[1][i] + shift
+
+    def overlapping(self, start, end):
+        """返回与 [start, end) 相交的部分 (起点, 终点, 样式id)，已裁剪到该范围内"""
+        result = []
+        for style_id, run in self.runs.items():
+            i = self.bisect_run(run, run[1], start)
+            while i < len(run[0]):
+                run_start, run_end = self.bounds(run, i)
+                if run_start >= end:
+                    break
+                result.append((max(run_start, start), min(run_end, end), style_id))
+                i += 1
+        return result
+
+    def at(self, offset):
+        """返回覆盖 offset 处字符的样式id"""
+        style_ids = []
+        for style_id, run in self.runs.items():
+            i = self.bisect_run(run, run[1], offset)
+            if i < len(run[0]) and self.bounds(run, i)[0] <= offset:
+                style_ids.append(style_id)
+        return style_ids
+
+    def spans(self):
+        """返回全部 (起点, 终点, 样式id)，按样式分组"""
+        return [self.bounds(run, i) + (style_id,) for style_id, run in self.runs.items()
+                for i in range(len(run[0]))]
+
+    def edit(self, offset, removed, inserted, inherit=True):
+        """文本在 offset 处删除 removed 个字符或插入 inserted 个字符后更新
+
+        与 Tk 一致：删除时区间收缩，收缩为空的区间去掉；inherit 为真（insert 不带标签列表）时，
+        落在区间内部的插入文本沿用该格式，否则区间在插入处拆开
+        """
+        for style_id in list(self.runs):
+            run = self.runs[style_id]
+            if removed:
+                self.delete_range(run, offset, offset + removed)
+            if inserted:
+                self.insert_text(run, offset, inserted, inherit)
+            if not run[0]:
+                del self.runs[style_id]
+
+    def replace_runs(self, run, i, j, pairs, delta):
+        """用实际值 pairs 替换第 i 到 j-1 个区间，其后的区间整体移动 delta"""
+        starts, ends, shift_from, shift = run
+        if shift and i > shift_from:
+            starts[shift_from:i] = [start + shift for start in starts[shift_from:i]]
+            ends[shift_from:i] = [end + shift for end in ends[shift_from:i]]
+        elif shift and i < shift_from:
+            starts[i:shift_from] = [start - shift for start in starts[i:shift_from]]
+            ends[i:shift_from] = [end - shift for end in ends[i:shift_from]]
+        shift += delta
+        starts[i:j] = [start - shift for start, _end in pairs]
+        ends[i:j] = [end - shift for _start, end in pairs]
+        run[2], run[3] = i, shift
+
+    def delete_range(self, run, start, end):
+        """删除 [start, end) 后收缩区间"""
+        length = end - start
+        # 连同两侧相邻的区间一起处理，删除后首尾相接的区间合并为一个
+        i = max(self.bisect_run(run, run[1], start) - 1, 0)
+        j = min(self.bisect_run(run, run[0], end, right=False) + 1, len(run[0]))
+        pairs = []
+        for k in range(i, j):
+            run_start, run_end = self.bounds(run, k)
+            run_start = run_start if run_start <= start else max(start, run_start - length)
+            run_end = run_end if run_end <= start else (run_end - length if run_end > end else start)
+            if run_start >= run_end:
+                continue
+            if pairs and pairs[-1][1] >= run_start:
+                pairs[-1] = (pairs[-1][0], run_end)
+            else:
+                pairs.append((run_start, run_end))
+        self.replace_runs(run, i, j, pairs, -length)
+
+    def insert_text(self, run, offset, length, inherit):
+        """在 offset 处插入 length 个字符后移动区间"""
+        i = self.bisect_run(run, run[1], offset)
+        pairs = []
+        j = i
+        if i < len(run[0]):
+            run_start, run_end = self.bounds(run, i)
+            if run_start < offset:
+                j = i + 1
+                if inherit:
+                    pairs.append((run_start, run_end + length))
+                else:
+                    pairs.extend(((run_start, offset), (offset + length, run_end + length)))
+        self.replace_runs(run, i, j, pairs, length)
+
+
+def pack_style_runs(spans):
+    """将区间 (起点, 终点, 样式id) 展平为样式段数组 [偏移, 长度, 样式id, ...]"""
+    runs = []
+    for start, end, style_id in spans:
+        runs.extend((start, end - start, style_id))
+    return runs
+
+
+def legacy_style_runs(color_ranges, styles, line_index):
+    """将旧版本逐范围记录的 color_ranges 转换为 (样式段数组, 样式表)
+
+    1.1版及以前每个范围只记录颜色 'color'；1.2版记录样式id 'style'，样式属性在 styles 字典中。
+    line_index 为该文本的 LineIndex，用于把范围的 'line.col' 换算为字符偏移
+    """
+    table = []
+    positions = {}  # 样式的JSON -> 样式表中的下标
+    spans = []
+    for color_range in color_ranges:
+        if 'style' in color_range:
+            style = (styles or {}).get(str(color_range['style']))
+        else:
+            style = {'foreground': color_range.get('color')}
+        style = {key: value for key, value in (style or {}).items() if value}
+        if not style:
+            continue
+        key = json.dumps(style, sort_keys=True, ensure_ascii=False)
+        if key not in positions:
+            positions[key] = len(table)
+            table.append(style)
+        spans.append((line_index.offset(color_range['start']), line_index.offset(color_range['end']),
+                      positions[key]))
+    return pack_style_runs(coalesce_runs(spans)), table
+
+
+def fuzzy_match_score(query, text):
+    """按子序列模糊匹配打分，不匹配时返回None；query 与 text 均应为小写
+
+    连续出现的字符串得分最高，越靠前越好；否则按子序列匹配，字符间隔越小、越靠近词首得分越高
+    """
+    position = text.find(query)
+    if position >= 0:
+        return 1000 - min(position, 500)
+    score = 0
+    position = 0
+    previous = -1
+    for char in query:
+        position = text.find(char, position)
+        if position < 0:
+            return None
+        if position == previous + 1:
+            score += 8  # 连续字符
+        elif position == 0 or not text[position - 1].isalnum():
+            score += 5  # 词首
+        else:
+            score -= min(position - previous, 20) // 4
+        previous = position
+        position += 1
+    return score
+
+# 崩溃恢复快照目录：每个编辑器进程一个会话子目录，进程运行期间持有其中锁文件的独占锁
+RECOVERY_DIR = os.path.join(os.path.expanduser('~'), '.topmost_editor', 'recovery')
+RECOVERY_LOCK_NAME = 'session.lock'
+
+
+def lock_session_dir(session_dir):
+    """以独占锁打开会话目录中的锁文件并返回文件对象；锁已被其他进程持有（会话仍在运行）时返回 None
+
+    进程退出（包括崩溃）时操作系统自动释放锁
+    """
+    os.makedirs(session_dir, exist_ok=True)
+    lock_file = open(os.path.join(session_dir, RECOVERY_LOCK_NAME), 'a+b')
+    try:
+        if msvcrt is not None:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def remove_session_dir(session_dir, lock_file):
+    """释放会话锁并删除整个会话目录"""
+    import shutil
+    lock_file.close()
+    shutil.rmtree(session_dir, ignore_errors=True)
+
 class TopMostEditor:
     def __init__(self, root):
         self.root = root
@@ -37,13 +1083,62 @@ class TopMostEditor:
         self.project_filename = None  # 当前项目文件路径
         self.project_modified = False  # 项目是否有未保存的更改
         self.project_name = "未命名项目"  # 项目名称
+        self.dirty_tab_ids = set()  # 有未保存更改的标签页id，只在修改标记变化时更新
+        self._title_update_id = None  # 合并到空闲时执行的窗口标题更新
+        self._cursor_update_id = None  # 合并到空闲时执行的光标位置更新
+        self._window_title = None  # 当前显示的窗口标题
+        # 快速切换索引：标签页id -> {'revision', 'title', 'title_key', 'content_key', 'preview'}
+        self.tab_search_index = {}
         # 初始化图片拖拽相关属性
         self.drag_data = None
         self.drag_canvas = None  # 用于自由拖拽的Canvas覆盖层
         self.floating_images = {}  # 存储浮动图片Label组件
+        # 样式注册表：相同格式共用一个 style_N 标签，样式id -> 规范化的样式属性
+        self.styles = {}
+        self.style_ids = {}  # 样式属性的JSON -> 样式id
+        # 每个文本组件的行首偏移表（组件路径名 -> LineIndex），编辑时增量更新，无法增量更新时删除并在下次使用时重建
+        self.line_indexes = {}
+        self.style_run_indexes = {}  # 组件路径名 -> StyleRuns，编辑文本时随之移动，格式变化或撤销/重做时删除
+        # 语法高亮：已完整高亮过的组件，及其待重新高亮的行范围（组件路径名 -> (首行, 末行)）
+        self.highlighted_widgets = set()
+        self.highlight_dirty = {}
+        self._edit_hook_command = None  # 编辑钩子回调的 Tcl 命令名
+        # 本程序最近复制的富文本：写入剪贴板的JSON及其解析后的结构，程序内粘贴时直接复用
+        self.copied_richtext = None
+        self.copied_richtext_data = None
+        self.chunk_insert_job = None  # 正在分片插入的任务，同一时间只有一个
+        # 项目级图片存储：内容哈希 -> {'data': 原始编码字节, 'image': 显示尺寸的PIL图片, 'photo': PhotoImage}
+        # 'future' 为线程池中尚未取回的解码任务
+        self.image_store = {}
+        self.image_decoder = None  # 图片解码线程池，首次使用时创建
+        self._photo_batch_id = None  # 分批创建PhotoImage的定时器
+        # 后台保存项目相关状态
+        self.project_save_thread = None  # 正在写入项目的后台线程
+        self.project_save_queue = None  # 后台线程回传进度与结果的队列
+        self.project_save_job = None  # 本次保存的目标路径及需要在失败时恢复的修改标记
+        self.project_save_again = None  # 保存进行中又请求了保存：(目标路径, 是否关联项目)
+        self.project_layout = None  # 当前项目文件的数据块布局，供追加日志模式沿用未变化的数据块
+        # 加载编辑器设置
+        self.settings = self.load_editor_settings()
+        # 自动保存（崩溃恢复）相关状态
+        import time
+        self.recovery_session_dir = os.path.join(RECOVERY_DIR, f"{int(time.time())}_{os.getpid()}")
+        try:
+            self.recovery_lock = lock_session_dir(self.recovery_session_dir)
+        except OSError as e:
+            print(f"创建恢复会话目录失败: {e}")
+            self.recovery_lock = None
+        self.recovery_tab_ids = set()  # 本会话已写入恢复快照的标签页
+        self.autosave_thread = None  # 正在写入恢复快照的后台线程
+        self._autosave_id = None  # 防抖定时器
         self.setup_ui()
         # 创建第一个标签页
         self.create_new_tab("新建文档")
+        # 启动后检查上次异常退出留下的恢复快照
+        self.root.after(500, self.check_recovery_snapshots)
+        # 定时让长时间未使用的标签页休眠
+        self.hibernation_savings = {}  # 休眠标签页id -> 估计节省的内存字节数
+        self.root.after(HIBERNATE_CHECK_MS, self.hibernate_idle_tabs)
         
     def setup_ui(self):
         # Configure the main window
@@ -83,9 +1178,20 @@ class TopMostEditor:
         self.tab_panel.pack(side=tk.LEFT, fill=tk.Y)
         self.tab_panel.pack_propagate(False)  # 固定宽度
         
-        # 标签页容器（书签式叠放）
+        # 标签页容器（书签式叠放）：只为可见的标签页创建按钮，按钮在滚动时复用
         self.tab_container = tk.Frame(self.tab_panel, bg=self.default_bg)
         self.tab_container.pack(fill=tk.BOTH, expand=True, padx=2, pady=5)
+        self.tab_slots = []  # 可见按钮槽位：{'button', 'tab_id', 'state', 'shown'}
+        self.tab_scroll = 0  # 第一个可见标签页的索引
+        self.tab_visible_count = TAB_STRIP_DEFAULT_SLOTS  # 当前可见的按钮槽位数
+        self.tab_scroll_up = tk.Button(self.tab_container, text="▲", command=lambda: self.scroll_tab_strip(-1),
+                                       bg=self.default_bg, fg=self.default_fg, relief=tk.FLAT,
+                                       font=("Arial", 6), width=2, bd=0)
+        self.tab_scroll_down = tk.Button(self.tab_container, text="▼", command=lambda: self.scroll_tab_strip(1),
+                                         bg=self.default_bg, fg=self.default_fg, relief=tk.FLAT,
+                                         font=("Arial", 6), width=2, bd=0)
+        self.tab_container.bind('<Configure>', lambda e: self.render_tab_strip())
+        self.tab_container.bind('<MouseWheel>', self.on_tab_strip_wheel)
         
         # 新建标签页按钮（小图标）
         new_tab_btn = tk.Button(self.tab_panel, text="+", command=lambda: self.create_new_tab(),
@@ -109,8 +1215,11 @@ class TopMostEditor:
         self.text_frame = tk.Frame(self.editor_frame, bg=self.default_bg)
         self.text_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
-        self.text_editor = tk.Text(self.text_frame, wrap=tk.WORD, undo=True, padx=5, pady=5, 
-                              bg=self.default_bg, fg=self.default_fg, insertbackground=self.default_fg)
+        # 每个最近使用的标签页保留一个文本组件，切换时只切换显示（见 activate_tab_widget）
+        # 组件统一由 create_text_widget 创建，外观选项记录在 text_widget_options 中
+        self.text_pool = {}  # 标签页id -> {'widget', 'floating_images', 'line_number_widgets', 'stale'}，按最近使用排序
+        self.text_widget_options = {'bg': self.default_bg, 'fg': self.default_fg, 'insertbackground': self.default_fg}
+        self.text_editor = self.create_text_widget()
         self.text_editor.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
         # 初始化内嵌行号相关变量
@@ -156,30 +1265,12 @@ class TopMostEditor:
         
         # 配置编辑器字体
         self.default_font = font.Font(family="Consolas", size=10)
-        self.text_editor.configure(font=self.default_font)
-        
-        # 配置语法高亮标签
-        self.text_editor.tag_configure("keyword", foreground="blue")
-        self.text_editor.tag_configure("string", foreground="green")
-        self.text_editor.tag_configure("comment", foreground="gray")
-        self.text_editor.tag_configure("function", foreground="purple")
-        self.text_editor.tag_configure("number", foreground="orange")
+        self.configure_text_widgets(font=self.default_font)
         
         # 显示行号（默认关闭）
         if self.show_line_numbers:
             self.update_line_numbers()
         
-        # 绑定事件
-        self.text_editor.bind("<KeyRelease>", self.on_key_release)
-        self.text_editor.bind("<Button-1>", self.update_cursor_position)
-        self.text_editor.bind("<<Modified>>", self.update_modified)
-        self.text_editor.bind('<Configure>', self.on_text_changed)
-        self.text_editor.bind('<MouseWheel>', self.on_text_changed)
-        self.text_editor.bind('<KeyPress>', self.on_text_changed)
-        self.text_editor.bind('<ButtonRelease>', self.on_text_changed)
-        # 绑定右键菜单
-        self.text_editor.bind("<Button-3>", self.show_format_menu)
-        
         # 键盘快捷键
         self.root.bind("<Control-n>", lambda event: self.new_file())
         self.root.bind("<Control-o>", lambda event: self.open_file())
@@ -188,13 +1279,12 @@ class TopMostEditor:
         self.root.bind("<Control-Shift-P>", lambda event: self.save_project())
         self.root.bind("<Control-Shift-O>", lambda event: self.open_project())
         self.root.bind("<Control-f>", lambda event: self.find_text())
+        self.root.bind("<Control-p>", lambda event: self.show_quick_switcher())
         self.root.bind("<Control-q>", lambda event: self.exit_app())
         self.root.bind("<Control-z>", lambda event: self.undo())
         self.root.bind("<Control-y>", lambda event: self.redo())
         self.root.bind("<Control-x>", lambda event: self.cut())
         self.root.bind("<Control-c>", lambda event: self.copy())
-        # 将 Ctrl+V 绑定到文本编辑器并返回 "break"，避免与默认粘贴冲突
-        self.text_editor.bind("<Control-v>", lambda event: (self.paste() or "break"))
         
         # 创建窗口边缘调整大小区域
         self.create_resize_borders()
@@ -211,6 +1301,41 @@ class TopMostEditor:
         # 更新窗口标题
         self.update_window_title()
     
+    def create_text_widget(self):
+        """创建一个标签页文本组件，带有统一的外观、语法高亮标签与事件绑定"""
+        text_widget = tk.Text(self.text_frame, wrap=tk.WORD, undo=True, padx=5, pady=5,
+                              **self.text_widget_options)
+        
+        # 配置语法高亮标签
+        text_widget.tag_configure("keyword", foreground="blue")
+        text_widget.tag_configure("string", foreground="green")
+        text_widget.tag_configure("comment", foreground="gray")
+        text_widget.tag_configure("function", foreground="purple")
+        text_widget.tag_configure("number", foreground="orange")
+        
+        # 绑定事件
+        text_widget.bind("<KeyRelease>", self.on_key_release)
+        text_widget.bind("<Button-1>", self.update_cursor_position)
+        text_widget.bind("<<Modified>>", self.update_modified)
+        text_widget.bind('<Configure>', self.on_text_changed)
+        text_widget.bind('<MouseWheel>', self.on_text_changed)
+        text_widget.bind('<KeyPress>', self.on_text_changed)
+        text_widget.bind('<ButtonRelease>', self.on_text_changed)
+        # 绑定右键菜单
+        text_widget.bind("<Button-3>", self.show_format_menu)
+        # 将 Ctrl+V 绑定到文本编辑器并返回 "break"，避免与默认粘贴冲突
+        text_widget.bind("<Control-v>", lambda event: (self.paste() or "break"))
+        self.install_edit_hook(text_widget)
+        return text_widget
+    
+    def configure_text_widgets(self, **options):
+        """修改所有标签页文本组件的外观（字体、颜色等），之后新建的组件也使用这些选项"""
+        self.text_widget_options.update(options)
+        widgets = {id(entry['widget']): entry['widget'] for entry in self.text_pool.values()}
+        widgets[id(self.text_editor)] = self.text_editor
+        for text_widget in widgets.values():
+            text_widget.config(**options)
+    
     def create_custom_title_bar(self):
         """创建自定义标题栏"""
         self.title_bar = tk.Frame(self.root, bg=self.default_bg, height=30)
@@ -483,6 +1608,23 @@ class TopMostEditor:
         file_menu.add_command(label="保存项目 (Ctrl+Shift+P)", command=self.save_project)
         file_menu.add_command(label="项目另存为", command=self.save_project_as)
         file_menu.add_command(label="打开项目 (Ctrl+Shift+O)", command=self.open_project)
+        file_menu.add_command(label="打开项目中的部分标签页...", command=self.open_project_partial)
+        self.journal_var = tk.BooleanVar(value=self.settings['project_journal'])
+        file_menu.add_checkbutton(label="增量保存项目（追加日志）", variable=self.journal_var,
+                                  command=self.toggle_project_journal)
+        
+        # 压缩保存子菜单（.rted 与 .rtep）
+        compression_menu = tk.Menu(file_menu, tearoff=0, bg=self.default_bg, fg=self.default_fg)
+        self.compression_var = tk.StringVar(value=self.settings['compression'])
+        for label, value in (("不压缩", 'none'), ("zlib", 'zlib'), ("lzma (xz)", 'lzma'), ("bz2", 'bz2')):
+            compression_menu.add_radiobutton(label=label, value=value, variable=self.compression_var,
+                                             command=self.change_compression)
+        compression_menu.add_separator()
+        self.compression_level_var = tk.IntVar(value=self.settings['compression_level'])
+        for label, value in (("最快 (1)", 1), ("默认 (6)", 6), ("最小 (9)", 9)):
+            compression_menu.add_radiobutton(label=label, value=value, variable=self.compression_level_var,
+                                             command=self.change_compression)
+        file_menu.add_cascade(label="压缩保存", menu=compression_menu)
         file_menu.add_separator()
         file_menu.add_command(label="退出 (Ctrl+Q)", command=self.exit_app)
         file_btn.config(menu=file_menu)
@@ -502,6 +1644,7 @@ class TopMostEditor:
         edit_menu.add_command(label="粘贴 (Ctrl+V)", command=self.paste)
         edit_menu.add_separator()
         edit_menu.add_command(label="查找 (Ctrl+F)", command=self.find_text)
+        edit_menu.add_command(label="快速切换标签页 (Ctrl+P)", command=self.show_quick_switcher)
         edit_btn.config(menu=edit_menu)
         
         # 插入菜单按钮
@@ -547,6 +1690,8 @@ class TopMostEditor:
     
     def create_new_tab(self, title="新建文档"):
         """创建新的标签页"""
+        if self.chunk_insert_pending():
+            return
         self.tab_counter += 1
         if title == "新建文档":
             title = f"新建文档{self.tab_counter}"
@@ -561,7 +1706,8 @@ class TopMostEditor:
             'image_info': {},
             'modified': False,
             'cursor_pos': '1.0',
-            'custom_color': None  # 自定义颜色
+            'custom_color': None,  # 自定义颜色
+            'revision': 0  # 内容/格式/图片每变化一次加一，用于增量保存
         }
         
         # 添加到标签页列表
@@ -586,54 +1732,158 @@ class TopMostEditor:
         self.text_editor.edit_modified(False)
     
     def create_tab_ui(self, tab_index):
-        """创建书签式标签页的UI元素"""
-        tab_data = self.tabs[tab_index]
-        
-        # 创建书签式标签页（显示标题第一个字符）
+        """标签页加入列表后刷新标签栏（按钮按需创建，见 render_tab_strip）"""
+        self.render_tab_strip()
+    
+    def tab_index_by_id(self, tab_id):
+        """按标签页id查找其当前索引，标签页已关闭时返回None"""
+        for index, tab in enumerate(self.tabs):
+            if tab['id'] == tab_id:
+                return index
+        return None
+    
+    def tab_button_state(self, tab_data, tab_index):
+        """标签页按钮应有的 (文字, 背景色, 文字颜色, 样式)"""
+        # 书签式标签页显示标题第一个字符
         tab_display = tab_data['title'][0] if tab_data['title'] else str(tab_index + 1)
-        
-        # 确定标签页颜色
-        bg_color = tab_data.get('custom_color', self.default_bg)
-        fg_color = self.get_contrast_color(bg_color) if tab_data.get('custom_color') else self.default_fg
-        
-        tab_btn = tk.Button(self.tab_container, text=tab_display,
-                           command=lambda: self.switch_to_tab(tab_index),
-                           bg=bg_color, fg=fg_color, relief=tk.RAISED,
-                           font=("Arial", 8, "bold"), width=2, height=1,
-                           bd=1)
-        tab_btn.pack(pady=1)
-        
-        # 绑定鼠标事件
-        tab_btn.bind("<Enter>", lambda e: self.show_tooltip(e, tab_data['title']))
-        tab_btn.bind("<Leave>", lambda e: self.hide_tooltip())
-        tab_btn.bind("<Button-3>", lambda e: self.show_tab_context_menu(e, tab_index))
-        
-        # 保存UI引用
-        tab_data['ui_button'] = tab_btn
-        tab_data['ui_frame'] = None  # 书签式不需要frame
-        tab_data['ui_close'] = None  # 关闭功能通过右键菜单实现
-    
-    def switch_to_tab(self, tab_index):
-        """切换到指定标签页"""
+        custom_color = tab_data.get('custom_color')
+        
+        if tab_index == self.current_tab_index:
+            # 当前活动标签页
+            if custom_color:
+                # 如果有自定义颜色，使其稍微深一点表示活动状态
+                active_color = self.darken_color(custom_color, 0.8)
+                return tab_display, active_color, self.get_contrast_color(active_color), tk.SUNKEN
+            # 使用默认的活动颜色
+            return tab_display, "#8A8A8A", self.default_fg, tk.SUNKEN
+        # 非活动标签页
+        if custom_color:
+            return tab_display, custom_color, self.get_contrast_color(custom_color), tk.RAISED
+        return tab_display, self.default_bg, self.default_fg, tk.RAISED
+    
+    def create_tab_slot(self):
+        """创建一个可复用的标签页按钮槽位，点击等事件在触发时才按槽位当前的标签页id查找标签页"""
+        slot = {'tab_id': None, 'state': None, 'shown': True}
+        slot['button'] = tk.Button(self.tab_container, font=("Arial", 8, "bold"), width=2, height=1, bd=1,
+                                   command=lambda: self.on_tab_slot_click(slot))
+        slot['button'].grid(row=len(self.tab_slots) + 1, column=0, pady=1)
+        slot['button'].bind("<Enter>", lambda e: self.on_tab_slot_hover(e, slot))
+        slot['button'].bind("<Leave>", lambda e: self.hide_tooltip())
+        slot['button'].bind("<Button-3>", lambda e: self.on_tab_slot_menu(e, slot))
+        slot['button'].bind("<MouseWheel>", self.on_tab_strip_wheel)
+        self.tab_slots.append(slot)
+    
+    def render_tab_strip(self):
+        """按当前滚动位置刷新可见的标签页按钮，只重新配置显示内容有变化的按钮"""
+        container_height = self.tab_container.winfo_height()
+        capacity = container_height // TAB_SLOT_HEIGHT if container_height > 1 else TAB_STRIP_DEFAULT_SLOTS
+        capacity = max(1, capacity)
+        overflow = len(self.tabs) > capacity
+        visible = max(1, capacity - 2) if overflow else capacity
+        self.tab_visible_count = visible
+        self.tab_scroll = max(0, min(self.tab_scroll, len(self.tabs) - visible))
+        
+        while len(self.tab_slots) < visible:
+            self.create_tab_slot()
+        while len(self.tab_slots) > visible:
+            self.tab_slots.pop()['button'].destroy()
+        
+        for offset, slot in enumerate(self.tab_slots):
+            tab_index = self.tab_scroll + offset
+            if tab_index < len(self.tabs):
+                tab = self.tabs[tab_index]
+                state = self.tab_button_state(tab, tab_index)
+                if slot['tab_id'] != tab['id'] or slot['state'] != state:
+                    text, bg_color, fg_color, relief = state
+                    slot['button'].config(text=text, bg=bg_color, fg=fg_color, relief=relief)
+                    slot['tab_id'] = tab['id']
+                    slot['state'] = state
+                if not slot['shown']:
+                    slot['button'].grid()
+                    slot['shown'] = True
+            elif slot['shown']:
+                slot['button'].grid_remove()
+                slot['tab_id'] = None
+                slot['state'] = None
+                slot['shown'] = False
+        
+        # 标签页超出可见范围时显示滚动按钮
+        if overflow:
+            self.tab_scroll_up.grid(row=0, column=0)
+            self.tab_scroll_down.grid(row=visible + 1, column=0)
+            self.tab_scroll_up.config(state=tk.NORMAL if self.tab_scroll > 0 else tk.DISABLED)
+            self.tab_scroll_down.config(
+                state=tk.NORMAL if self.tab_scroll + visible < len(self.tabs) else tk.DISABLED)
+        else:
+            self.tab_scroll_up.grid_remove()
+            self.tab_scroll_down.grid_remove()
+    
+    def scroll_tab_strip(self, step):
+        """滚动标签栏"""
+        self.tab_scroll += step
+        self.render_tab_strip()
+    
+    def on_tab_strip_wheel(self, event):
+        """鼠标滚轮滚动标签栏"""
+        self.scroll_tab_strip(-1 if event.delta > 0 else 1)
+        return "break"
+    
+    def ensure_tab_visible(self, tab_index):
+        """必要时滚动标签栏，使指定标签页可见"""
+        visible = self.tab_visible_count
+        if tab_index < self.tab_scroll:
+            self.tab_scroll = tab_index
+        elif tab_index >= self.tab_scroll + visible:
+            self.tab_scroll = tab_index - visible + 1
+    
+    def on_tab_slot_click(self, slot):
+        """点击标签页按钮"""
+        tab_index = self.tab_index_by_id(slot['tab_id'])
+        if tab_index is not None:
+            self.switch_to_tab(tab_index)
+    
+    def on_tab_slot_hover(self, event, slot):
+        """鼠标悬停时显示标签页完整标题"""
+        tab_index = self.tab_index_by_id(slot['tab_id'])
+        if tab_index is not None:
+            self.show_tooltip(event, self.tabs[tab_index]['title'])
+    
+    def on_tab_slot_menu(self, event, slot):
+        """标签页按钮右键菜单"""
+        tab_index = self.tab_index_by_id(slot['tab_id'])
+        if tab_index is not None:
+            self.show_tab_context_menu(event, tab_index)
+    
+    def switch_to_tab(self, tab_index, save_current=True):
+        """切换到指定标签页
+
+        save_current 为假时不保存当前标签页（当前标签页已被关闭）
+        """
+        if self.chunk_insert_pending():
+            return
         if tab_index < 0 or tab_index >= len(self.tabs):
             return
         
         # 清理拖拽Canvas状态
         self.cleanup_drag_canvas()
         
-        # 保存当前标签页状态
-        if self.tabs and self.current_tab_index < len(self.tabs):
-            self.save_current_tab_state()
+        # 记录当前标签页状态（文本与格式留在其文本组件中）
+        import time
+        if save_current and self.tabs and self.current_tab_index < len(self.tabs):
+            self.stash_current_tab()
+            self.tabs[self.current_tab_index]['last_active'] = time.monotonic()
         
         # 更新当前标签页索引
         self.current_tab_index = tab_index
         current_tab = self.tabs[tab_index]
+        current_tab['last_active'] = time.monotonic()
         
         # 更新UI状态
         self.update_tab_ui_states()
         
-        # 加载标签页内容
-        self.load_tab_content(current_tab)
+        # 显示标签页的文本组件（不在缓存池中时加载内容）
+        self.activate_tab_widget(current_tab)
+        self.prefetch_tab_images(tab_index)
         
         # 更新filename
         self.filename = current_tab['filename']
@@ -656,34 +1906,7 @@ class TopMostEditor:
         current_tab = self.tabs[self.current_tab_index]
         
         try:
-            # 保存内容
-            current_tab['content'] = self.text_editor.get(1.0, tk.END)
-            
-            # 保存光标位置
-            current_tab['cursor_pos'] = self.text_editor.index(tk.INSERT)
-            
-            # 保存修改状态
-            current_tab['modified'] = self.text_editor.edit_modified()
-            
-            # 保存颜色信息
-            color_ranges = []
-            
-            # 获取所有文字标签
-            for tag_name in self.text_editor.tag_names():
-                if tag_name.startswith(('color_', 'size_', 'font_', 'underline', 'format_')):
-                    ranges = self.text_editor.tag_ranges(tag_name)
-                    color = self.text_editor.tag_cget(tag_name, 'foreground')
-                    
-                    # 将范围转换为字符串格式保存
-                    for i in range(0, len(ranges), 2):
-                        if i + 1 < len(ranges):
-                            color_ranges.append({
-                                'start': str(ranges[i]),
-                                'end': str(ranges[i + 1]),
-                                'color': color
-                            })
-            
-            current_tab['color_ranges'] = color_ranges
+            previous_images = self.image_signature(current_tab.get('image_info', {}))
             
             # 保存图片信息
             if hasattr(self, 'images'):
@@ -692,12 +1915,207 @@ class TopMostEditor:
                 current_tab['image_info'] = self.image_info.copy()
             if hasattr(self, 'floating_images'):
                 current_tab['floating_images'] = list(self.floating_images.keys())
+            
+            if self.image_signature(current_tab['image_info']) != previous_images:
+                current_tab['revision'] = current_tab.get('revision', 0) + 1
+            self.save_tab_state(current_tab, self.text_editor)
         except tk.TclError:
             # 如果组件已被销毁，跳过保存
             pass
     
+    def save_tab_state(self, tab, text_widget):
+        """从文本组件读取标签页的文本、光标、修改状态与格式，内容或格式变化时递增修订号"""
+        # 记录保存前的状态，用于判断内容是否真的变化
+        previous_content = tab.get('content')
+        previous_runs = tab.get('style_runs')
+        previous_styles = tab.get('styles')
+        
+        # 保存内容
+        tab['content'] = text_widget.get(1.0, tk.END)
+        
+        # 保存光标位置
+        tab['cursor_pos'] = text_widget.index(tk.INSERT)
+        
+        # 保存修改状态
+        self.set_tab_modified(tab, bool(text_widget.edit_modified()))
+        
+        # 保存格式信息：样式段数组只记录偏移、长度与样式表下标
+        style_runs, styles = self.collect_style_runs(text_widget)
+        tab['style_runs'] = style_runs
+        tab['styles'] = styles
+        tab.pop('color_ranges', None)
+        
+        # 内容或格式有变化时递增修订号，增量保存据此只写入变化的标签页
+        if tab['content'] != previous_content or style_runs != previous_runs or styles != previous_styles:
+            tab['revision'] = tab.get('revision', 0) + 1
+    
+    def stash_current_tab(self):
+        """切换离开当前标签页时只记录光标、修改状态与图片引用，文本与格式留在文本组件中，需要时再由 sync_tab_state 读取"""
+        current_tab = self.tabs[self.current_tab_index]
+        entry = self.text_pool.get(current_tab['id'])
+        if entry is None or entry['widget'] is not self.text_editor:
+            # 文本组件不属于该标签页，只能完整保存
+            self.save_current_tab_state()
+            return
+        
+        try:
+            current_tab['cursor_pos'] = self.text_editor.index(tk.INSERT)
+            self.set_tab_modified(current_tab, bool(self.text_editor.edit_modified()))
+        except tk.TclError:
+            return
+        previous_images = self.image_signature(current_tab.get('image_info', {}))
+        current_tab['images'] = self.images.copy()
+        current_tab['image_info'] = self.image_info.copy()
+        current_tab['floating_images'] = list(self.floating_images.keys())
+        if self.image_signature(current_tab['image_info']) != previous_images:
+            current_tab['revision'] = current_tab.get('revision', 0) + 1
+        
+        entry['floating_images'] = self.floating_images
+        entry['line_number_widgets'] = self.line_number_widgets
+        entry['stale'] = True  # 标签页数据中的文本与格式可能已过期
+    
+    def activate_tab_widget(self, tab_data):
+        """显示标签页的文本组件：在缓存池中时直接切换显示，否则（复用空闲组件或新建）加载内容"""
+        entry = self.text_pool.pop(tab_data['id'], None)
+        if entry is not None:
+            # 移到最近使用的位置
+            self.text_pool[tab_data['id']] = entry
+            self.show_text_widget(entry)
+            self.images = tab_data.get('images', []).copy()
+            self.image_info = tab_data.get('image_info', {}).copy()
+            self.update_line_numbers()
+            return
+        
+        # 休眠的标签页先解压文本与格式，图片在加载时按需解码
+        self.wake_tab(tab_data)
+        
+        owned = any(pooled['widget'] is self.text_editor for pooled in self.text_pool.values())
+        if owned:
+            entry = {'widget': self.create_text_widget(), 'floating_images': {},
+                     'line_number_widgets': {}, 'stale': False}
+        else:
+            # 当前组件不属于任何标签页（启动、导入或关闭当前标签页后），直接复用
+            entry = {'widget': self.text_editor, 'floating_images': self.floating_images,
+                     'line_number_widgets': self.line_number_widgets, 'stale': False}
+            self.text_editor.edit_reset()
+        self.text_pool[tab_data['id']] = entry
+        self.show_text_widget(entry)
+        self.load_tab_content(tab_data)
+        self.evict_text_widgets()
+    
+    def show_text_widget(self, entry):
+        """将缓存池中的文本组件设为当前编辑器，不再属于任何标签页的旧组件随之销毁"""
+        text_widget = entry['widget']
+        previous_widget = self.text_editor
+        if text_widget is not previous_widget:
+            previous_widget.pack_forget()
+            text_widget.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+            if not any(pooled['widget'] is previous_widget for pooled in self.text_pool.values()):
+                previous_widget.destroy()
+        self.text_editor = text_widget
+        self.floating_images = entry['floating_images']
+        self.line_number_widgets = entry['line_number_widgets']
+        text_widget.config(yscrollcommand=self.scrollbar_y.set)
+        self.scrollbar_y.config(command=text_widget.yview)
+        text_widget.focus_set()
+    
+    def sync_tab_state(self, tab_data):
+        """确保标签页数据中的文本与格式是最新的（缓存池中未激活的组件在变化后只读取一次）"""
+        if self.tabs and self.current_tab_index < len(self.tabs) and tab_data is self.tabs[self.current_tab_index]:
+            self.save_current_tab_state()
+            return
+        entry = self.text_pool.get(tab_data['id'])
+        if entry is not None and entry['stale']:
+            try:
+                self.save_tab_state(tab_data, entry['widget'])
+            except tk.TclError:
+                pass
+            entry['stale'] = False
+    
+    def sync_all_tab_states(self):
+        """同步所有标签页的数据，导出或自动保存前调用"""
+        for tab in self.tabs:
+            self.sync_tab_state(tab)
+    
+    def evict_text_widgets(self):
+        """缓存池超过数量或总字数上限时，将最久未使用的标签页写回数据并销毁其文本组件"""
+        tabs_by_id = {tab['id']: tab for tab in self.tabs}
+        max_widgets = max(1, self.settings['text_pool_size'])
+        max_chars = self.settings['text_pool_max_chars']
+        
+        def pooled_chars():
+            return sum(len(tabs_by_id[tab_id].get('content', '')) for tab_id in self.text_pool if tab_id in tabs_by_id)
+        
+        while len(self.text_pool) > 1 and (len(self.text_pool) > max_widgets or pooled_chars() > max_chars):
+            # 字典按最近使用排序，第一个不是当前组件的即为最久未使用
+            tab_id = next(tab_id for tab_id, entry in self.text_pool.items()
+                          if entry['widget'] is not self.text_editor)
+            if tab_id in tabs_by_id:
+                self.sync_tab_state(tabs_by_id[tab_id])
+            self.release_tab_widget(tab_id)
+    
+    def release_tab_widget(self, tab_id):
+        """从缓存池移除标签页并销毁其文本组件（当前显示的组件保留，由下一个标签页复用）"""
+        entry = self.text_pool.pop(tab_id, None)
+        if entry is not None and entry['widget'] is not self.text_editor:
+            entry['widget'].destroy()
+    
+    def reset_text_pool(self):
+        """清空缓存池（导入项目时），只保留当前显示的组件"""
+        for tab_id in list(self.text_pool):
+            self.release_tab_widget(tab_id)
+    
+    def image_signature(self, image_info):
+        """图片集合的特征（内容哈希与拖动状态），与Tk分配的图片名称无关"""
+        return sorted((info.get('image_hash') or '', bool(info.get('draggable')))
+                      for info in image_info.values())
+    
+    def hydrate_tab(self, tab_data):
+        """首次激活延迟加载的标签页时，解码其图片并建立图片信息"""
+        for img_data in tab_data.pop('pending_images', []):
+            try:
+                # 相同图片共享同一个PIL图片与PhotoImage
+                image, photo = self.load_stored_image(img_data['image_ref'])
+                
+                # 保存图片信息到标签页
+                tab_data['images'].append(photo)
+                
+                # 根据图片类型设置不同的属性
+                image_info = {
+                    'photo': photo,
+                    'draggable': img_data.get('draggable', False),
+                    'file_path': img_data.get('file_path', ''),
+                    'original_image': image
+                }
+                self.cache_image_encoding(image_info, img_data['image_ref'])
+                
+                if img_data.get('type') == 'floating':
+                    # 浮动图片
+                    image_info.update({
+                        'is_floating': True,
+                        'x': img_data.get('x', 10),
+                        'y': img_data.get('y', 10)
+                    })
+                else:
+                    # 嵌入式图片
+                    image_info.update({
+                        'x_offset': img_data.get('x_offset', 0),
+                        'y_offset': img_data.get('y_offset', 0)
+                    })
+                
+                tab_data['image_info'][img_data['name']] = image_info
+                
+            except Exception as e:
+                print(f"恢复图片时出错: {e}")
+        
+        tab_data['hydrated'] = True
+    
     def load_tab_content(self, tab_data):
         """加载标签页内容"""
+        # 延迟加载的标签页在首次激活时才解码图片
+        if not tab_data.get('hydrated', True):
+            self.hydrate_tab(tab_data)
+        
         # 清空编辑器
         self.text_editor.delete(1.0, tk.END)
         
@@ -705,17 +2123,9 @@ class TopMostEditor:
         if tab_data['content']:
             self.text_editor.insert(1.0, tab_data['content'])
         
-        # 恢复颜色信息
-        if 'color_ranges' in tab_data:
-            for i, color_range in enumerate(tab_data['color_ranges']):
-                tag_name = f'color_{i}'
-                self.text_editor.tag_add(tag_name, 
-                                       color_range['start'], 
-                                       color_range['end'])
-                self.text_editor.tag_config(tag_name, 
-                                          foreground=color_range['color'])
-                # 提升颜色标签优先级，避免被其他标签覆盖
-                self.text_editor.tag_raise(tag_name)
+        # 恢复格式信息
+        style_runs, styles = self.tab_style_runs(tab_data)
+        self.restore_style_runs(self.text_editor, style_runs, styles, self.document_index())
         
         # 恢复光标位置
         try:
@@ -745,15 +2155,17 @@ class TopMostEditor:
         if 'images' in tab_data:
             self.images = tab_data['images'].copy()
         if 'image_info' in tab_data:
-            self.image_info = tab_data['image_info'].copy()
-            
-            # 重新创建浮动图片
-            for image_name, info in self.image_info.items():
+            # 按文本组件返回的新名称重建图片信息，避免重复登记同一图片
+            self.image_info = {}
+            for image_name, info in tab_data['image_info'].items():
                 # 若旧项目保存了浮动图片信息，转换为嵌入式图片
                 try:
                     new_name = self.text_editor.image_create('end', image=info['photo'])
                     # 更新 key 与引用
                     self.image_info[new_name] = info
+                    self.bind_image_context_menu(new_name)
+                    if info.get('draggable', False):
+                        self.toggle_image_draggable(new_name, True)
                 except Exception as e:
                     print(f"创建嵌入式图片失败: {e}")
                     continue
@@ -766,35 +2178,10 @@ class TopMostEditor:
         self.update_line_numbers()
     
     def update_tab_ui_states(self):
-        """更新所有标签页的UI状态"""
-        for i, tab in enumerate(self.tabs):
-            try:
-                # 检查UI组件是否仍然有效
-                if 'ui_button' in tab and tab['ui_button'].winfo_exists():
-                    # 获取标签页的自定义颜色或默认颜色
-                    custom_color = tab.get('custom_color')
-                    
-                    if i == self.current_tab_index:
-                        # 当前活动标签页
-                        if custom_color:
-                            # 如果有自定义颜色，使其稍微深一点表示活动状态
-                            active_color = self.darken_color(custom_color, 0.8)
-                            text_color = self.get_contrast_color(active_color)
-                            tab['ui_button'].config(bg=active_color, fg=text_color, relief=tk.SUNKEN)
-                        else:
-                            # 使用默认的活动颜色
-                            active_bg = "#8A8A8A"
-                            tab['ui_button'].config(bg=active_bg, fg=self.default_fg, relief=tk.SUNKEN)
-                    else:
-                        # 非活动标签页
-                        if custom_color:
-                            text_color = self.get_contrast_color(custom_color)
-                            tab['ui_button'].config(bg=custom_color, fg=text_color, relief=tk.RAISED)
-                        else:
-                            tab['ui_button'].config(bg=self.default_bg, fg=self.default_fg, relief=tk.RAISED)
-            except tk.TclError:
-                # 如果组件已被销毁，跳过更新
-                continue
+        """更新标签页的UI状态（保持当前标签页可见）"""
+        if self.tabs and self.current_tab_index < len(self.tabs):
+            self.ensure_tab_visible(self.current_tab_index)
+        self.render_tab_strip()
     
     def show_tooltip(self, event, text):
         """显示工具提示"""
@@ -820,12 +2207,19 @@ class TopMostEditor:
             self.tooltip_window = None
     
     def show_tab_context_menu(self, event, tab_index):
-        """显示标签页右键菜单"""
+        """显示标签页右键菜单（菜单项按标签页id在执行时重新查找索引）"""
+        tab_id = self.tabs[tab_index]['id']
+        
+        def for_tab(action):
+            index = self.tab_index_by_id(tab_id)
+            if index is not None:
+                action(index)
+        
         context_menu = tk.Menu(self.root, tearoff=0)
-        context_menu.add_command(label="重命名", command=lambda: self.rename_tab(tab_index))
-        context_menu.add_command(label="自定义颜色", command=lambda: self.customize_tab_color(tab_index))
+        context_menu.add_command(label="重命名", command=lambda: for_tab(self.rename_tab))
+        context_menu.add_command(label="自定义颜色", command=lambda: for_tab(self.customize_tab_color))
         context_menu.add_separator()
-        context_menu.add_command(label="关闭标签页", command=lambda: self.close_tab(tab_index))
+        context_menu.add_command(label="关闭标签页", command=lambda: for_tab(self.close_tab))
         
         try:
             context_menu.tk_popup(event.x_root, event.y_root)
@@ -846,28 +2240,8 @@ class TopMostEditor:
             # 保存颜色到标签页数据
             tab_data['custom_color'] = color[1]
             
-            # 应用颜色到标签页按钮
-            self.apply_tab_color(tab_index, color[1])
-            
             # 更新UI状态
-            self.update_tab_ui_states()
-    
-    def apply_tab_color(self, tab_index, color):
-        """应用颜色到标签页"""
-        tab_data = self.tabs[tab_index]
-        tab_button = tab_data.get('ui_button')
-        
-        if tab_button and tab_button.winfo_exists():
-            try:
-                # 设置背景颜色
-                tab_button.config(bg=color)
-                
-                # 根据背景颜色自动选择合适的文字颜色
-                text_color = self.get_contrast_color(color)
-                tab_button.config(fg=text_color)
-                
-            except tk.TclError:
-                pass
+            self.render_tab_strip()
     
     def rename_tab(self, tab_index):
         """重命名标签页"""
@@ -902,8 +2276,8 @@ class TopMostEditor:
                 # 更新窗口标题（如果是当前标签页）
                 if tab_index == self.current_tab_index:
                     self.update_window_title()
-                # 刷新所有标签页UI以更新显示
-                self.refresh_all_tabs_ui()
+                # 只更新该标签页的按钮
+                self.render_tab_strip()
             dialog.destroy()
         
         def cancel_rename():
@@ -921,6 +2295,8 @@ class TopMostEditor:
     
     def close_tab(self, tab_index):
         """关闭指定标签页"""
+        if self.chunk_insert_pending():
+            return
         if len(self.tabs) <= 1:
             self.show_message("提示", "至少需要保留一个标签页", "info")
             return
@@ -940,47 +2316,38 @@ class TopMostEditor:
                 if not self.save_file():
                     return
         
-        # 销毁UI
-        if tab_to_close['ui_button']:
-            tab_to_close['ui_button'].destroy()
-        
         # 从列表中移除
         self.tabs.pop(tab_index)
+        self.dirty_tab_ids.discard(tab_to_close['id'])
+        self.hibernation_savings.pop(tab_to_close['id'], None)
+        self.schedule_title_update()
         
         # 调整当前标签页索引
-        if tab_index < self.current_tab_index:
-            self.current_tab_index -= 1
-        elif tab_index == self.current_tab_index:
-            # 如果关闭的是当前标签页，切换到相邻标签页
+        if tab_index == self.current_tab_index:
+            # 如果关闭的是当前标签页，切换到相邻标签页（不保存已关闭标签页的内容，其组件由相邻标签页复用或销毁）
+            self.text_pool.pop(tab_to_close['id'], None)
             if self.current_tab_index >= len(self.tabs):
                 self.current_tab_index = len(self.tabs) - 1
-            self.switch_to_tab(self.current_tab_index)
+            self.switch_to_tab(self.current_tab_index, save_current=False)
+        else:
+            if tab_index < self.current_tab_index:
+                self.current_tab_index -= 1
+            self.release_tab_widget(tab_to_close['id'])
         
-        # 重新创建所有标签页UI（更新索引）
-        self.refresh_all_tabs_ui()
+        # 刷新标签栏（按钮按id复用，只更新变化的部分）
+        self.render_tab_strip()
     
     def refresh_all_tabs_ui(self):
         """刷新所有标签页的UI"""
-        # 清空容器
-        for widget in self.tab_container.winfo_children():
-            widget.destroy()
-        
-        # 重新创建所有标签页UI
-        for i, tab in enumerate(self.tabs):
-            self.create_tab_ui(i)
-            # 重新绑定事件（因为索引可能改变）
-            tab['ui_button'].bind("<Enter>", lambda e, title=tab['title']: self.show_tooltip(e, title))
-            tab['ui_button'].bind("<Leave>", lambda e: self.hide_tooltip())
-            tab['ui_button'].bind("<Button-3>", lambda e, idx=i: self.show_tab_context_menu(e, idx))
-        
-        # 更新UI状态
-        self.update_tab_ui_states()
+        self.render_tab_strip()
         
     def new_file(self):
         # 创建新的标签页
         self.create_new_tab()
     
     def open_file(self):
+        if self.chunk_insert_pending():
+            return
         if self.check_save_changes():
             file_path = filedialog.askopenfilename(
                 filetypes=[
@@ -997,13 +2364,13 @@ class TopMostEditor:
                 try:
                     if file_path.lower().endswith('.rtep'):
                         # 检查是否为项目文件（包含多个标签页）还是单个富文本文件
-                        with open(file_path, 'r', encoding='utf-8') as file:
-                            data = json.load(file)
+                        data = load_project_data(file_path)
                         
                         # 如果包含tabs字段，说明是项目文件
                         if 'tabs' in data:
                             # 打开项目文件
                             if self.import_project_data(data):
+                                self.project_layout = data.get('layout')
                                 self.project_filename = file_path
                                 self.project_name = os.path.splitext(os.path.basename(file_path))[0]
                                 self.project_modified = False
@@ -1017,11 +2384,10 @@ class TopMostEditor:
                             current_tab = self.tabs[self.current_tab_index]
                             current_tab['filename'] = file_path
                             current_tab['title'] = os.path.basename(file_path)
-                            current_tab['modified'] = False
+                            self.set_tab_modified(current_tab, False)
                             
                             # 更新标签页UI（书签式显示标题第一个字符）
-                            tab_display = current_tab['title'][0] if current_tab['title'] else str(self.current_tab_index + 1)
-                            current_tab['ui_button'].config(text=tab_display)
+                            self.render_tab_strip()
                             
                             self.filename = file_path
                             self.update_window_title()
@@ -1035,56 +2401,69 @@ class TopMostEditor:
                         current_tab = self.tabs[self.current_tab_index]
                         current_tab['filename'] = file_path
                         current_tab['title'] = os.path.basename(file_path)
-                        current_tab['modified'] = False
+                        self.set_tab_modified(current_tab, False)
                         
                         # 更新标签页UI（书签式显示标题第一个字符）
-                        tab_display = current_tab['title'][0] if current_tab['title'] else str(self.current_tab_index + 1)
-                        current_tab['ui_button'].config(text=tab_display)
+                        self.render_tab_strip()
                         
                         self.filename = file_path
                         self.update_window_title()
                         self.update_line_numbers()
                         self.apply_syntax_highlighting()
                     else:
-                        # 打开纯文本文件
-                        self.open_plain_text_file(file_path)
-                        
-                        # 更新当前标签页信息
+                        # 打开纯文本文件，大文件载入完成后才关联文件名，取消时不会覆盖原文件
                         current_tab = self.tabs[self.current_tab_index]
-                        current_tab['filename'] = file_path
-                        current_tab['title'] = os.path.basename(file_path)
-                        current_tab['modified'] = False
                         
-                        # 更新标签页UI（书签式显示标题第一个字符）
-                        tab_display = current_tab['title'][0] if current_tab['title'] else str(self.current_tab_index + 1)
-                        current_tab['ui_button'].config(text=tab_display)
+                        def finish_open(current_tab=current_tab, file_path=file_path):
+                            # 更新标签页信息
+                            current_tab['filename'] = file_path
+                            current_tab['title'] = os.path.basename(file_path)
+                            self.set_tab_modified(current_tab, False)
+                            
+                            # 更新标签页UI（书签式显示标题第一个字符）
+                            self.render_tab_strip()
+                            
+                            if current_tab is self.tabs[self.current_tab_index]:
+                                self.filename = file_path
+                                self.update_window_title()
+                                self.update_line_numbers()
+                                self.apply_syntax_highlighting()
                         
-                        self.filename = file_path
-                        self.update_window_title()
-                        self.update_line_numbers()
-                        self.apply_syntax_highlighting()
+                        self.open_plain_text_file(file_path, finish_open)
                 except Exception as e:
                     self.show_message("错误", f"无法打开文件: {str(e)}", "error")
     
-    def open_plain_text_file(self, file_path):
-        """打开纯文本文件"""
-        with open(file_path, "r", encoding="utf-8") as file:
-            content = file.read()
-            self.text_editor.delete(1.0, tk.END)
-            self.text_editor.insert(1.0, content)
-            
-            # 清理图片信息
+    def open_plain_text_file(self, file_path, on_done=None):
+        """打开纯文本文件：分块读取，大文件分片插入不阻塞界面，载入完成后调用 on_done"""
+        text_widget = self.text_editor
+        size = os.path.getsize(file_path)
+        chunks = read_text_chunks(file_path)
+        if size <= LARGE_INSERT_CHARS:
+            # 小文件先完整读取，解码出错时不会清空编辑器
+            chunks = iter([(''.join(text for text, _progress in chunks), size)])
+        was_modified = text_widget.edit_modified()
+        
+        def finished():
+            # 原内容已被替换，清理图片信息
             if hasattr(self, 'image_info'):
                 self.image_info.clear()
             if hasattr(self, 'images'):
                 self.images.clear()
-            
             # 重置修改状态，避免打开文件时显示未保存更改
-            self.text_editor.edit_modified(False)
+            text_widget.edit_modified(False)
+            if on_done:
+                on_done()
+        
+        def cancelled():
+            # 原内容保持不变
+            text_widget.edit_modified(was_modified)
+        
+        self.start_chunked_insert(text_widget, chunks, size, '1.0', finished, "正在打开",
+                                  replace=True, on_cancel=cancelled)
     
     def open_rich_text_file(self, file_path):
-        """打开富文本文件"""
-        with open(file_path, 'r', encoding='utf-8') as file:
+        """打开富文本文件（自动识别是否经过压缩）"""
+        with open_text_file(file_path) as file:
             data = json.load(file)
         
         # 清空编辑器
@@ -1114,15 +2493,30 @@ class TopMostEditor:
         
         # 恢复图片
         images_data = data.get('images', [])
+        image_store = data.get('image_store', {})
+        
+        # 先登记所有图片并提交到线程池并行解码，再按顺序插入
+        image_hashes = []
         for img_data in images_data:
             try:
-                # 从base64恢复图片
-                image_base64 = img_data['image_data']
-                image_bytes = base64.b64decode(image_base64)
-                image = Image.open(BytesIO(image_bytes))
-                
-                # 创建PhotoImage
-                photo = ImageTk.PhotoImage(image)
+                # 1.1版按哈希引用共享图片，1.0版每个条目内联base64
+                if 'image_ref' in img_data:
+                    image_hash = img_data['image_ref']
+                    if image_hash not in self.image_store:
+                        self.register_image_data(base64.b64decode(image_store[image_hash]), image_hash)
+                else:
+                    image_hash = self.register_image_data(base64.b64decode(img_data['image_data']))
+            except Exception as e:
+                print(f"恢复图片时出错: {e}")
+                image_hash = None
+            image_hashes.append(image_hash)
+        self.decode_images_async(image_hash for image_hash in image_hashes if image_hash)
+        
+        for img_data, image_hash in zip(images_data, image_hashes):
+            if image_hash is None:
+                continue
+            try:
+                image, photo = self.load_stored_image(image_hash)
                 
                 # 生成唯一的图片名称
                 import time
@@ -1150,6 +2544,7 @@ class TopMostEditor:
                         'x': x,
                         'y': y
                     }
+                    self.cache_image_encoding(self.image_info[image_name], image_hash)
                     
                     # 绑定右键菜单
                     self.bind_floating_image_context_menu(image_name)
@@ -1178,6 +2573,7 @@ class TopMostEditor:
                         'x_offset': img_data.get('x_offset', 0),
                         'y_offset': img_data.get('y_offset', 0)
                     }
+                    self.cache_image_encoding(self.image_info[image_name], image_hash)
                     
                     # 绑定右键菜单
                     self.bind_image_context_menu(image_name)
@@ -1190,25 +2586,25 @@ class TopMostEditor:
                 print(f"恢复图片时出错: {e}")
                 self.show_message("警告", f"无法恢复某个图片: {str(e)}", "warning")
         
-        # 恢复颜色信息
-        color_ranges = data.get('color_ranges', [])
-        # 将颜色范围同步到当前标签页数据
+        # 恢复格式信息（图片已插入，偏移换算需计入嵌入的图片）
+        line_index = self.document_index()
+        if 'style_runs' in data:
+            style_runs, styles = data['style_runs'], data.get('styles', [])
+        else:
+            style_runs, styles = legacy_style_runs(data.get('color_ranges', []), data.get('styles'), line_index)
+        # 将格式同步到当前标签页数据
         if self.tabs and self.current_tab_index < len(self.tabs):
-            self.tabs[self.current_tab_index]['color_ranges'] = color_ranges
-        for i, color_range in enumerate(color_ranges):
-            tag_name = f'color_{i}'
-            self.text_editor.tag_add(tag_name, 
-                                   color_range['start'], 
-                                   color_range['end'])
-            self.text_editor.tag_config(tag_name, 
-                                      foreground=color_range['color'])
-            # 提升颜色标签优先级，避免被其他标签覆盖
-            self.text_editor.tag_raise(tag_name)
+            self.tabs[self.current_tab_index]['style_runs'] = style_runs
+            self.tabs[self.current_tab_index]['styles'] = styles
+            self.tabs[self.current_tab_index].pop('color_ranges', None)
+        self.restore_style_runs(self.text_editor, style_runs, styles, line_index)
         
         # 重置修改状态，避免打开文件时显示未保存更改
         self.text_editor.edit_modified(False)
     
     def save_file(self):
+        if self.chunk_insert_pending():
+            return False
         # 保存前先同步当前标签页状态
         self.save_current_tab_state()
         
@@ -1225,15 +2621,14 @@ class TopMostEditor:
                 if result:
                     # 更新当前标签页信息
                     current_tab = self.tabs[self.current_tab_index]
-                    current_tab['modified'] = False
+                    self.set_tab_modified(current_tab, False)
                     current_tab['title'] = os.path.basename(self.filename)
                     
                     # 重置文本编辑器的修改状态
                     self.text_editor.edit_modified(False)
                     
                     # 更新标签页UI（书签式显示标题第一个字符）
-                    tab_display = current_tab['title'][0] if current_tab['title'] else str(self.current_tab_index + 1)
-                    current_tab['ui_button'].config(text=tab_display)
+                    self.render_tab_strip()
                     
                     # 更新窗口标题
                     self.update_window_title()
@@ -1267,41 +2662,29 @@ class TopMostEditor:
         
         # 准备保存数据
         save_data = {
-            'version': '1.0',
+            'version': '1.3',
             'text': content,
             'images': [],
-            'color_ranges': []
+            'image_store': {},
+            'style_runs': [],
+            'styles': []
         }
         
-        # 保存颜色信息
-        save_color_ranges = []
-        for tag_name in self.text_editor.tag_names():
-            if tag_name.startswith(('color_', 'size_', 'font_', 'underline', 'format_')):
-                ranges = self.text_editor.tag_ranges(tag_name)
-                color = self.text_editor.tag_cget(tag_name, 'foreground')
-                
-                # 将范围转换为字符串格式保存
-                for i in range(0, len(ranges), 2):
-                    if i + 1 < len(ranges):
-                        save_color_ranges.append({
-                            'start': str(ranges[i]),
-                            'end': str(ranges[i + 1]),
-                            'color': color
-                        })
+        # 保存格式信息
+        save_data['style_runs'], save_data['styles'] = self.collect_style_runs(self.text_editor)
         
-        # 保存图片信息
+        # 保存图片信息（复用缓存的编码字节，相同图片只写入一次）
         if hasattr(self, 'image_info'):
             for image_name, image_info in self.image_info.items():
                 try:
-                    # 将图片转换为base64
-                    original_image = image_info['original_image']
-                    buffer = BytesIO()
-                    original_image.save(buffer, format='PNG')
-                    image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+                    image_hash = self.encode_image_info(image_info)
+                    if image_hash not in save_data['image_store']:
+                        save_data['image_store'][image_hash] = base64.b64encode(
+                            image_info['encoded']).decode('utf-8')
                     
                     image_data = {
                         'file_path': image_info['file_path'],
-                        'image_data': image_base64,
+                        'image_ref': image_hash,
                         'draggable': image_info['draggable']
                     }
                     
@@ -1329,14 +2712,20 @@ class TopMostEditor:
                 except Exception as e:
                     print(f"保存图片时出错: {e}")
         
-        # 保存到文件
-        with open(self.filename, 'w', encoding='utf-8') as file:
-            json.dump(save_data, file, ensure_ascii=False, indent=2)
+        # 保存到文件（按设置流式压缩）
+        compression = self.settings['compression']
+        with create_text_file(self.filename, compression, self.settings['compression_level']) as file:
+            if compression == 'none':
+                json.dump(save_data, file, ensure_ascii=False, indent=2)
+            else:
+                json.dump(save_data, file, ensure_ascii=False, separators=(',', ':'))
         
         self.text_editor.edit_modified(False)
         return True
     
     def save_as(self):
+        if self.chunk_insert_pending():
+            return False
         # 检查是否有多个标签页
         has_multiple_tabs = len(self.tabs) > 1
         # 检查是否包含图片
@@ -1361,12 +2750,8 @@ class TopMostEditor:
             # 检查文件扩展名，决定保存方式
             if file_path.lower().endswith('.rtep'):
                 # 保存为项目文件
-                if self.save_project_to_file(file_path):
-                    self.project_filename = file_path
-                    self.project_name = os.path.splitext(os.path.basename(file_path))[0]
-                    self.update_window_title()
-                    return True
-                return False
+                # 保存成功后才将项目关联到新文件
+                return self.save_project_to_file(file_path, bind=True)
             else:
                 # 保存为单文件
                 self.filename = file_path
@@ -1377,8 +2762,7 @@ class TopMostEditor:
                 current_tab['title'] = os.path.basename(file_path)
                 
                 # 更新标签页UI（书签式显示标题第一个字符）
-                tab_display = current_tab['title'][0] if current_tab['title'] else str(self.current_tab_index + 1)
-                current_tab['ui_button'].config(text=tab_display)
+                self.render_tab_strip()
                 
                 result = self.save_file()
                 if result:
@@ -1387,6 +2771,9 @@ class TopMostEditor:
         return False
     
     def exit_app(self):
+        # 取消正在进行的分片插入，恢复原内容后再检查未保存的更改
+        self.cancel_chunked_insert()
+        
         # 清理拖拽Canvas状态
         self.cleanup_drag_canvas()
         
@@ -1399,10 +2786,26 @@ class TopMostEditor:
                     pass
             self.floating_images.clear()
         
+        # 等待进行中的后台保存写完，避免退出时留下未完成的文件
+        self.wait_for_project_save()
+        
         # 检查项目是否有未保存的更改
         if not self.check_project_changes():
             return
         
+        # 正常退出，不再需要恢复快照
+        if self._autosave_id is not None:
+            self.root.after_cancel(self._autosave_id)
+            self._autosave_id = None
+        if self.autosave_thread is not None:
+            self.autosave_thread.join()
+        self.discard_recovery_session()
+        if self.recovery_lock is not None:
+            remove_session_dir(self.recovery_session_dir, self.recovery_lock)
+            self.recovery_lock = None
+        if self.image_decoder is not None:
+            self.image_decoder.shutdown(wait=False, cancel_futures=True)
+        
         # 关闭主窗口
         try:
             self.root.destroy()
@@ -1450,61 +2853,213 @@ class TopMostEditor:
             return  # 无选区
 
         selected_text = self.text_editor.get(sel_start, sel_end)
+        line_index = self.document_index()
+        sel_start_offset = line_index.offset(sel_start)
+        sel_end_offset = line_index.offset(sel_end)
         tags_payload = {}
-        for tag_name in self.text_editor.tag_names():
-            if tag_name.startswith(("color_", "size_", "font_", "underline", "format_")):
-                ranges = self.text_editor.tag_ranges(tag_name)
-                rel_ranges = []
-                for i in range(0, len(ranges), 2):
-                    if i + 1 < len(ranges):
-                        r_start, r_end = ranges[i], ranges[i+1]
-                        # 仅保留与选区相交的范围
-                        if self.text_editor.compare(r_end, ">", sel_start) and self.text_editor.compare(r_start, "<", sel_end):
-                            start_offset = self.text_editor.count(sel_start, r_start, "chars")[0]
-                            end_offset = self.text_editor.count(sel_start, r_end, "chars")[0]
-                            rel_ranges.append([start_offset, end_offset])
-                if rel_ranges:
-                    tags_payload[tag_name] = {
-                        "config": {
-                            "foreground": self.text_editor.tag_cget(tag_name, "foreground"),
-                            "font": self.text_editor.tag_cget(tag_name, "font"),
-                            "underline": self.text_editor.tag_cget(tag_name, "underline")
-                        },
-                        "ranges": rel_ranges
-                    }
-        package = json.dumps({"__richtext__": True, "text": selected_text, "tags": tags_payload})
+        # 只查询与选区相交的样式段，偏移相对选区起点
+        for start_offset, end_offset, style_id in self.document_style_runs().overlapping(sel_start_offset,
+                                                                                         sel_end_offset):
+            tag_payload = tags_payload.setdefault(f"style_{style_id}", {"config": self.styles[style_id],
+                                                                        "ranges": []})
+            tag_payload["ranges"].append([start_offset - sel_start_offset, end_offset - sel_start_offset])
+        payload = {"__richtext__": True, "text": selected_text, "tags": tags_payload}
+        package = json.dumps(payload)
         self.root.clipboard_clear()
         self.root.clipboard_append(package)
         self.copied_richtext = package
+        self.copied_richtext_data = payload
     
     def paste(self):
         """粘贴剪贴板内容，支持富文本"""
+        if self.chunk_insert_pending():
+            return
         try:
             clip = self.root.clipboard_get()
         except tk.TclError:
             return
-        try:
-            data = json.loads(clip)
-            if isinstance(data, dict) and data.get("__richtext__"):
-                text = data.get("text", "")
-                insert_index = self.text_editor.index(tk.INSERT)
-                self.text_editor.insert(insert_index, text)
-                for tag_name, tag_data in data.get("tags", {}).items():
-                    cfg = {k: v for k, v in tag_data.get("config", {}).items() if v not in ("", None)}
-                    if cfg:
-                        self.text_editor.tag_config(tag_name, **cfg)
-                    for r in tag_data.get("ranges", []):
-                        if len(r) == 2:
-                            start_pos = f"{insert_index}+{r[0]}c"
-                            end_pos = f"{insert_index}+{r[1]}c"
-                            self.text_editor.tag_add(tag_name, start_pos, end_pos)
-                self.update_line_numbers()
-                return
-        except Exception:
-            pass  # 非富文本
+        data = None
+        if clip == self.copied_richtext:
+            # 本程序刚复制的内容，复用已有的结构
+            data = self.copied_richtext_data
+        elif clip.startswith(RICH_CLIPBOARD_PREFIX):
+            try:
+                data = json.loads(clip)
+            except ValueError:
+                data = None  # 非富文本
+        if isinstance(data, dict) and data.get("__richtext__"):
+            self.insert_rich_text(data)
+            return
+        if len(clip) > LARGE_INSERT_CHARS:
+            # 大段纯文本分片插入，替换选中的文字
+            try:
+                self.text_editor.delete(tk.SEL_FIRST, tk.SEL_LAST)
+            except tk.TclError:
+                pass
+            self.start_chunked_insert(self.text_editor, split_text_chunks(clip), len(clip),
+                                      self.text_editor.index(tk.INSERT), self.update_line_numbers, "正在粘贴")
+            return
         self.text_editor.event_generate("<<Paste>>")
         self.update_line_numbers()
     
+    def insert_rich_text(self, data):
+        """在光标处插入富文本剪贴板结构：文本不继承两侧的标签，插入完成后每种样式用一次 tag add 添加全部范围"""
+        text_widget = self.text_editor
+        text = data.get("text", "")
+        insert_index = text_widget.index(tk.INSERT)
+        insert_offset = self.document_index(text_widget).offset(insert_index)
+        
+        def apply_tags():
+            line_index = self.document_index(text_widget)
+            for tag_data in data.get("tags", {}).values():
+                style = self.normalize_style(tag_data.get("config", {}))
+                if not style:
+                    continue
+                indices = []
+                for r in tag_data.get("ranges", []):
+                    if len(r) == 2 and 0 <= r[0] < r[1] <= len(text):
+                        indices.append(line_index.index(insert_offset + r[0]))
+                        indices.append(line_index.index(insert_offset + r[1]))
+                add_tag_ranges(text_widget, self.style_tag(self.intern_style(style), text_widget), indices)
+            self.style_run_indexes.pop(str(text_widget), None)
+            self.update_line_numbers()
+        
+        self.start_chunked_insert(text_widget, split_text_chunks(text), len(text), insert_index,
+                                  apply_tags, "正在粘贴", tags=())
+    
+    # ==================== 分片插入 ====================
+    
+    def start_chunked_insert(self, text_widget, chunks, total, index, on_done=None, label="正在插入", tags=None,
+                             replace=False, on_cancel=None):
+        """将 chunks 产出的 (文本片段, 进度) 依次插入到 index 处，全部插入后调用 on_done
+        
+        total 为进度的总量，不超过 LARGE_INSERT_CHARS 时一次插入；否则每片之间让出事件循环，
+        状态栏显示进度，期间文本组件只读，按 Esc 取消并删除已插入的部分后调用 on_cancel。
+        tags 不为 None 时插入的文本只带这些标签。replace 为真时插入的文本替换全部内容：
+        原内容留在插入的文本之后，全部插入后才删除，取消或读取出错时原样保留
+        """
+        if self.chunk_insert_pending():
+            return False
+        tag_args = () if tags is None else (tags,)
+        if total <= LARGE_INSERT_CHARS:
+            text = ''.join(text for text, _progress in chunks)
+            if replace:
+                text_widget.delete('1.0', tk.END)
+            text_widget.insert(index, text, *tag_args)
+            if on_done:
+                on_done()
+            return True
+        
+        # 起点标记留在原处，终点标记随插入的文本后移
+        text_widget.mark_set('chunk_insert_start', index)
+        text_widget.mark_gravity('chunk_insert_start', tk.LEFT)
+        text_widget.mark_set('chunk_insert_end', index)
+        text_widget.mark_gravity('chunk_insert_end', tk.RIGHT)
+        # 整个插入作为一次撤销操作；插入期间禁止编辑，用户的修改不会混入这次撤销或被取消时删除
+        text_widget.edit_separator()
+        text_widget.config(autoseparators=False)
+        self.chunk_insert_job = {'widget': text_widget, 'chunks': chunks, 'total': max(total, 1),
+                                 'tag_args': tag_args, 'on_done': on_done, 'on_cancel': on_cancel,
+                                 'replace': replace, 'label': label, 'after_id': None,
+                                 'state': text_widget.cget('state'),
+                                 'escape_id': self.root.bind('<Escape>', self.cancel_chunked_insert)}
+        text_widget.config(state=tk.DISABLED)
+        self.status_bar.config(text=f"{label}... 0%（Esc 取消）")
+        self.chunk_insert_job['after_id'] = self.root.after(1, self.insert_next_chunk)
+        return True
+    
+    def chunk_insert_pending(self):
+        """有分片插入正在进行时提示并返回 True
+
+        载入期间文本组件中是新旧内容的混合，保存、打开、切换或关闭标签页等操作需等待完成或按 Esc 取消
+        """
+        job = self.chunk_insert_job
+        if job is None:
+            return False
+        self.show_message("请稍候", f"{job['label']}尚未完成，请等待完成或按 Esc 取消", "warning")
+        return True
+    
+    def insert_next_chunk(self):
+        """插入下一片文本并更新进度"""
+        job = self.chunk_insert_job
+        if job is None:
+            return
+        job['after_id'] = None
+        try:
+            text, progress = next(job['chunks'])
+        except StopIteration:
+            self.finish_chunked_insert()
+            return
+        except Exception as e:
+            self.cancel_chunked_insert()
+            self.show_message("错误", f"{job['label']}时出错: {str(e)}", "error")
+            return
+        text_widget = job['widget']
+        try:
+            text_widget.config(state=tk.NORMAL)
+            text_widget.insert('chunk_insert_end', text, *job['tag_args'])
+            text_widget.config(state=tk.DISABLED)
+        except tk.TclError:
+            # 文本组件已被释放
+            self.cancel_chunked_insert(status=f"{job['label']}已中断")
+            return
+        self.status_bar.config(text=f"{job['label']}... {progress * 100 // job['total']}%（Esc 取消）")
+        job['after_id'] = self.root.after(1, self.insert_next_chunk)
+    
+    def unbind_chunk_escape(self, job):
+        """取消分片插入期间的 Esc 绑定"""
+        if job['escape_id'] is not None:
+            self.root.unbind('<Escape>', job['escape_id'])
+            job['escape_id'] = None
+    
+    def end_chunked_insert(self, job):
+        """恢复文本组件的状态与撤销分隔，删除插入标记与 Esc 绑定"""
+        self.unbind_chunk_escape(job)
+        text_widget = job['widget']
+        try:
+            text_widget.config(state=job['state'], autoseparators=True)
+            text_widget.edit_separator()
+            text_widget.mark_unset('chunk_insert_start', 'chunk_insert_end')
+        except tk.TclError:
+            pass
+    
+    def finish_chunked_insert(self):
+        """分片插入完成；替换全部内容时此时才删除原内容"""
+        job, self.chunk_insert_job = self.chunk_insert_job, None
+        if job['replace']:
+            text_widget = job['widget']
+            try:
+                text_widget.config(state=tk.NORMAL)
+                # 删除到 end-1c：删除到 end 且起点在行首时 Tk 会改为删除前一个换行符
+                text_widget.delete('chunk_insert_end', 'end-1c')
+            except tk.TclError:
+                pass
+        self.end_chunked_insert(job)
+        self.update_cursor_position()
+        if job['on_done']:
+            job['on_done']()
+    
+    def cancel_chunked_insert(self, event=None, status=None):
+        """取消正在进行的分片插入，删除已插入的部分，状态栏显示 status（默认为已取消）"""
+        job, self.chunk_insert_job = self.chunk_insert_job, None
+        if job is None:
+            return
+        if job['after_id'] is not None:
+            self.root.after_cancel(job['after_id'])
+        job['chunks'].close()
+        try:
+            job['widget'].config(state=tk.NORMAL)
+            job['widget'].delete('chunk_insert_start', 'chunk_insert_end')
+        except tk.TclError:
+            pass
+        self.end_chunked_insert(job)
+        self.status_bar.config(text=status or f"{job['label']}已取消")
+        if job['on_cancel']:
+            try:
+                job['on_cancel']()
+            except tk.TclError:
+                pass
+    
     def insert_image(self):
         """插入图片到文本编辑器中"""
         if not PIL_AVAILABLE:
@@ -1524,28 +3079,9 @@ class TopMostEditor:
         
         if file_path:
             try:
-                # 打开并调整图片大小
-                image = Image.open(file_path)
-                
-                # 获取原始尺寸
-                original_width, original_height = image.size
-                
-                # 设置最大尺寸
-                max_width = 400
-                max_height = 300
-                
-                # 计算缩放比例
-                width_ratio = max_width / original_width
-                height_ratio = max_height / original_height
-                scale_ratio = min(width_ratio, height_ratio, 1.0)  # 不放大图片
-                
-                # 调整图片尺寸
-                new_width = int(original_width * scale_ratio)
-                new_height = int(original_height * scale_ratio)
-                image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                
-                # 转换为PhotoImage
-                photo = ImageTk.PhotoImage(image)
+                # 保存原始图片字节，显示用的缩小图由图片存储在解码时生成
+                image_hash = self.register_image_data(storable_image_bytes(file_path))
+                image, photo = self.load_stored_image(image_hash)
                 
                 # 将图片直接嵌入文本流，随滚动同步
                 cursor_pos = self.text_editor.index(tk.INSERT)
@@ -1563,6 +3099,8 @@ class TopMostEditor:
                     'file_path': file_path,
                     'original_image': image
                 }
+                # 保存时直接写入原始字节
+                self.cache_image_encoding(self.image_info[image_name], image_hash)
                 
                 # 绑定右键菜单并允许拖动开关
                 self.bind_image_context_menu(image_name)
@@ -1985,6 +3523,224 @@ class TopMostEditor:
         """显示PIL库未安装的警告"""
         self.show_message("功能不可用", "插入图片功能需要安装PIL库\n\n请在命令行中运行:\npip install Pillow", "warning")
     
+    # ==================== 标签页休眠 ====================
+    
+    def hibernate_idle_tabs(self):
+        """定时检查：长时间未激活的标签页进入休眠，并在状态栏显示节省的内存"""
+        import time
+        self.root.after(HIBERNATE_CHECK_MS, self.hibernate_idle_tabs)
+        idle_seconds = self.settings['hibernate_after_minutes'] * 60
+        if idle_seconds <= 0:
+            return
+        
+        now = time.monotonic()
+        hibernated = 0
+        for index, tab in enumerate(self.tabs):
+            if index == self.current_tab_index or 'hibernated' in tab:
+                continue
+            if now - tab.setdefault('last_active', now) >= idle_seconds:
+                try:
+                    self.hibernate_tab(tab)
+                    hibernated += 1
+                except Exception as e:
+                    print(f"标签页休眠失败: {e}")
+        
+        if hibernated:
+            self.release_unused_bitmaps()
+            saved_mb = sum(self.hibernation_savings.values()) / (1024 * 1024)
+            self.status_bar.config(text=f"已休眠 {len(self.hibernation_savings)} 个标签页，约节省 {saved_mb:.1f} MB 内存")
+    
+    def hibernate_tab(self, tab_data):
+        """压缩标签页的文本与格式，图片只保留编码字节的引用，并释放其文本组件"""
+        import sys
+        self.sync_tab_state(tab_data)
+        self.release_tab_widget(tab_data['id'])
+        
+        content = tab_data.get('content', '')
+        style_runs = tab_data.get('style_runs', [])
+        packed = zlib.compress(json.dumps({'content': content, 'style_runs': style_runs},
+                                          ensure_ascii=False).encode('utf-8'))
+        # 估算：字符串与样式段数组占用的内存减去压缩后的大小
+        saved = sys.getsizeof(content) + len(style_runs) * 36 - len(packed)
+        tab_data['hibernated'] = packed
+        tab_data['content'] = ''
+        tab_data['style_runs'] = []
+        
+        # 已加载的图片转回延迟加载的引用，激活时由 hydrate_tab 重新解码
+        if tab_data.get('hydrated', True):
+            pending_images = []
+            for image_name, image_info in tab_data.get('image_info', {}).items():
+                try:
+                    image_hash = self.encode_image_info(image_info)
+                except Exception as e:
+                    print(f"休眠时保存图片出错: {e}")
+                    continue
+                width, height = image_info['original_image'].size
+                saved += width * height * 4 * 2  # PIL图片与PhotoImage各一份位图
+                pending = {
+                    'name': image_name,
+                    'image_ref': image_hash,
+                    'file_path': image_info.get('file_path', ''),
+                    'draggable': image_info.get('draggable', False)
+                }
+                if 'label' in image_info or image_info.get('is_floating'):
+                    pending.update({'type': 'floating', 'x': image_info.get('x', 10), 'y': image_info.get('y', 10)})
+                else:
+                    pending.update({'type': 'embedded', 'x_offset': image_info.get('x_offset', 0),
+                                    'y_offset': image_info.get('y_offset', 0)})
+                pending_images.append(pending)
+            tab_data['pending_images'] = pending_images
+            tab_data['images'] = []
+            tab_data['image_info'] = {}
+            tab_data['hydrated'] = False
+        
+        self.hibernation_savings[tab_data['id']] = max(0, saved)
+    
+    def wake_tab(self, tab_data):
+        """恢复休眠标签页的文本与格式"""
+        packed = tab_data.pop('hibernated', None)
+        if packed is None:
+            return
+        state = json.loads(zlib.decompress(packed).decode('utf-8'))
+        tab_data['content'] = state['content']
+        tab_data['style_runs'] = state['style_runs']
+        self.hibernation_savings.pop(tab_data['id'], None)
+    
+    def tab_text_state(self, tab_data):
+        """返回标签页的 (文本, 格式)，休眠的标签页临时解压而不唤醒"""
+        packed = tab_data.get('hibernated')
+        if packed is None:
+            return tab_data.get('content', ''), tab_data.get('style_runs', [])
+        state = json.loads(zlib.decompress(packed).decode('utf-8'))
+        return state['content'], state['style_runs']
+    
+    def release_unused_bitmaps(self):
+        """释放不再被任何已加载标签页使用的图片位图，图片存储中只保留编码字节"""
+        in_use = {info.get('image_hash') for tab in self.tabs for info in tab.get('image_info', {}).values()}
+        in_use.update(info.get('image_hash') for info in getattr(self, 'image_info', {}).values())
+        for image_hash, entry in self.image_store.items():
+            if image_hash not in in_use and entry['photo'] is not None and 'future' not in entry:
+                entry['image'] = None
+                entry['photo'] = None
+    
+    # ==================== 快速切换标签页 ====================
+    
+    def tab_content_prefix(self, tab_data):
+        """标签页正文开头部分；显示中或缓存池中有未同步修改的标签页直接从文本组件读取"""
+        entry = self.text_pool.get(tab_data['id'])
+        if entry is not None and (entry['stale'] or entry['widget'] is self.text_editor):
+            try:
+                return entry['widget'].get('1.0', f'1.0+{TAB_INDEX_PREFIX_CHARS}c')
+            except tk.TclError:
+                pass
+        return self.tab_text_state(tab_data)[0][:TAB_INDEX_PREFIX_CHARS]
+    
+    def refresh_tab_search_index(self):
+        """增量更新快速切换索引：只重建标题或修订号变化的标签页，以及可能有未同步修改的文本组件"""
+        live_ids = set()
+        for tab in self.tabs:
+            tab_id = tab['id']
+            live_ids.add(tab_id)
+            indexed = self.tab_search_index.get(tab_id)
+            entry = self.text_pool.get(tab_id)
+            widget_dirty = entry is not None and (entry['stale'] or entry['widget'] is self.text_editor)
+            if (indexed is not None and not widget_dirty
+                    and indexed['revision'] == tab.get('revision', 0) and indexed['title'] == tab['title']):
+                continue
+            prefix = self.tab_content_prefix(tab)
+            self.tab_search_index[tab_id] = {
+                'revision': tab.get('revision', 0),
+                'title': tab['title'],
+                'title_key': tab['title'].lower(),
+                'content_key': prefix.lower(),
+                'preview': prefix.strip().split('\n', 1)[0][:40] if prefix.strip() else ''
+            }
+        for tab_id in set(self.tab_search_index) - live_ids:
+            del self.tab_search_index[tab_id]
+    
+    def search_tabs(self, query):
+        """按模糊匹配为标签页排序，返回 [(标签页id, 标题, 预览)]；标题匹配的权重高于正文"""
+        query = query.strip().lower()
+        results = []
+        for order, tab in enumerate(self.tabs):
+            indexed = self.tab_search_index.get(tab['id'])
+            if indexed is None:
+                continue
+            if not query:
+                results.append((0, order, tab['id'], indexed))
+                continue
+            title_score = fuzzy_match_score(query, indexed['title_key'])
+            content_score = fuzzy_match_score(query, indexed['content_key'])
+            scores = [score for score in (None if title_score is None else title_score * 2 + 100,
+                                          content_score) if score is not None]
+            if scores:
+                results.append((-max(scores), order, tab['id'], indexed))
+        results.sort(key=lambda item: (item[0], item[1]))
+        return [(tab_id, indexed['title'], indexed['preview'])
+                for _, _, tab_id, indexed in results[:QUICK_SWITCH_MAX_RESULTS]]
+    
+    def show_quick_switcher(self):
+        """Ctrl+P 快速切换标签页：输入标题或正文中的字符模糊查找"""
+        if hasattr(self, 'quick_switch_window') and self.quick_switch_window.winfo_exists():
+            self.quick_switch_window.lift()
+            return
+        
+        self.refresh_tab_search_index()
+        
+        window = tk.Toplevel(self.root)
+        self.quick_switch_window = window
+        window.title("快速切换标签页")
+        window.attributes('-topmost', True)
+        window.transient(self.root)
+        window.geometry("+%d+%d" % (self.root.winfo_rootx() + 40, self.root.winfo_rooty() + 40))
+        
+        query_var = tk.StringVar()
+        query_entry = tk.Entry(window, textvariable=query_var, width=40)
+        query_entry.pack(fill=tk.X, padx=5, pady=5)
+        result_listbox = tk.Listbox(window, height=10, width=50, activestyle='none')
+        result_listbox.pack(fill=tk.BOTH, expand=True, padx=5, pady=(0, 5))
+        
+        result_ids = []
+        
+        def update_results(*args):
+            result_ids.clear()
+            result_listbox.delete(0, tk.END)
+            for tab_id, title, preview in self.search_tabs(query_var.get()):
+                result_ids.append(tab_id)
+                result_listbox.insert(tk.END, f"{title}  —  {preview}" if preview else title)
+            if result_ids:
+                result_listbox.selection_set(0)
+        
+        def move_selection(step):
+            if not result_ids:
+                return "break"
+            selection = result_listbox.curselection()
+            index = (selection[0] if selection else 0) + step
+            index = max(0, min(index, len(result_ids) - 1))
+            result_listbox.selection_clear(0, tk.END)
+            result_listbox.selection_set(index)
+            result_listbox.see(index)
+            return "break"
+        
+        def choose(event=None):
+            selection = result_listbox.curselection()
+            window.destroy()
+            if selection:
+                tab_index = self.tab_index_by_id(result_ids[selection[0]])
+                if tab_index is not None and tab_index != self.current_tab_index:
+                    self.switch_to_tab(tab_index)
+            return "break"
+        
+        query_var.trace_add('write', update_results)
+        query_entry.bind('<Down>', lambda e: move_selection(1))
+        query_entry.bind('<Up>', lambda e: move_selection(-1))
+        query_entry.bind('<Return>', choose)
+        result_listbox.bind('<Double-Button-1>', choose)
+        window.bind('<Escape>', lambda e: window.destroy())
+        
+        update_results()
+        query_entry.focus_set()
+    
     def find_text(self):
         """查找和替换对话框"""
         if hasattr(self, 'find_window') and self.find_window.winfo_exists():
@@ -2039,13 +3795,8 @@ class TopMostEditor:
                 start = self.text_editor.index(tk.SEL_FIRST)
                 end = self.text_editor.index(tk.SEL_LAST)
                 
-                # 创建唯一标签名
-                import time
-                tag_name = f'color_{int(time.time() * 1000)}'
-                
-                # 应用颜色
-                self.text_editor.tag_add(tag_name, start, end)
-                self.text_editor.tag_config(tag_name, foreground=color)
+                # 应用颜色（相同颜色共用一个样式标签）
+                self.apply_style(start, end, {'foreground': color})
                 
             except tk.TclError:
                 # 没有选中文本时的处理
@@ -2064,15 +3815,14 @@ class TopMostEditor:
                 self.main_frame,
                 self.editor_frame,
                 self.text_frame,
-                self.text_editor,
                 self.status_bar,
             ]
             
             for widget in widgets:
                 widget.config(bg=bg_color)
                 
-            # 设置文本相关前景色
-            self.text_editor.config(fg=fg_color, insertbackground=fg_color)
+            # 所有标签页的文本组件使用相同的背景与前景色
+            self.configure_text_widgets(bg=bg_color, fg=fg_color, insertbackground=fg_color)
             self.status_bar.config(fg=fg_color)
             
             # 更新行号组件的颜色
@@ -2198,7 +3948,7 @@ class TopMostEditor:
             weight = "bold" if bold_var.get() else "normal"
             slant = "italic" if italic_var.get() else "roman"
             new_font = font.Font(family=family_var.get(), size=size_var.get(), weight=weight, slant=slant)
-            self.text_editor.configure(font=new_font)
+            self.configure_text_widgets(font=new_font)
             # 更新所有行号组件的字体
             for line_widget in self.line_number_widgets.values():
                 line_widget.configure(font=new_font)
@@ -2454,120 +4204,582 @@ class TopMostEditor:
         tk.Button(button_frame, text="重置", command=reset_transparency).pack(side=tk.LEFT, padx=5)
         tk.Button(button_frame, text="关闭", command=transparency_window.destroy).pack(side=tk.LEFT, padx=5)
     
-    def on_text_changed(self, event=None):
-        # 延迟更新行号，避免频繁更新
-        if hasattr(self, '_line_number_update_id'):
-            self.root.after_cancel(self._line_number_update_id)
-        self._line_number_update_id = self.root.after(100, self.update_line_numbers_smart)
+    def on_text_changed(self, event=None):
+        # 延迟更新行号，避免频繁更新
+        if hasattr(self, '_line_number_update_id'):
+            self.root.after_cancel(self._line_number_update_id)
+        self._line_number_update_id = self.root.after(100, self.update_line_numbers_smart)
+    
+    def on_key_release(self, event):
+        self.update_line_numbers()
+        self.schedule_cursor_update()
+        self.schedule_autosave()
+        
+        # Apply syntax highlighting for certain file types
+        if self.filename and (self.filename.endswith('.py') or self.filename.endswith('.pyw')):
+            self.apply_syntax_highlighting()
+    
+    def schedule_cursor_update(self):
+        """连续按键时光标位置只在空闲时更新一次"""
+        if self._cursor_update_id is None:
+            self._cursor_update_id = self.root.after_idle(self.update_cursor_position)
+    
+    def update_cursor_position(self, event=None):
+        self._cursor_update_id = None
+        cursor_position = self.text_editor.index(tk.INSERT)
+        line, column = cursor_position.split('.')
+        self.status_bar.config(text=f"行: {line} | 列: {column}")
+    
+    def update_modified(self, event=None):
+        """更新修改状态"""
+        if self.text_editor.edit_modified():
+            # 更新当前标签页的修改状态
+            if self.tabs and self.current_tab_index < len(self.tabs):
+                current_tab = self.tabs[self.current_tab_index]
+                self.set_tab_modified(current_tab, True)
+                
+                # 标记项目为已修改
+                self.mark_project_modified()
+                
+                # 标签页按钮不显示修改状态，保持原有显示
+            
+            # 窗口标题由修改标记的变化触发，在空闲时统一更新
+            self.schedule_autosave()
+            # 不要重置edit_modified状态，让它保持为True直到文件被保存
+    
+    def apply_syntax_highlighting(self):
+        """更新当前文本组件的语法高亮：首次完整高亮，之后只重新分词上次以来编辑过的行"""
+        text_widget = self.text_editor
+        widget_name = str(text_widget)
+        if widget_name not in self.highlighted_widgets:
+            self.highlight_lines(text_widget, 1, int(text_widget.index('end-1c').split('.')[0]))
+            self.highlighted_widgets.add(widget_name)
+            self.highlight_dirty.pop(widget_name, None)
+            # 完整高亮后，提升自定义格式标签优先级，避免被覆盖
+            for tag_name in text_widget.tag_names():
+                if tag_name.startswith(FORMAT_TAG_PREFIXES):
+                    text_widget.tag_raise(tag_name)
+        elif widget_name in self.highlight_dirty:
+            first, last = self.highlight_dirty.pop(widget_name)
+            self.highlight_lines(text_widget, first, last)
+
+    def line_end_state(self, text_widget, line):
+        """第 line 行结束时未闭合的三引号（由行尾换行符上的状态标签得出），没有则为 None"""
+        if line < 1:
+            return None
+        tag_names = text_widget.tag_names(f'{line}.end')
+        for quote, tag in SYNTAX_STATE_TAGS.items():
+            if tag in tag_names:
+                return quote
+        return None
+
+    def highlight_lines(self, text_widget, first, last):
+        """重新分词第 first 到 last 行并只更新这些行的语法标签
+
+        若末行结束时的三引号状态与原来不同（多行字符串开始或结束），继续向后处理，直到状态与原来一致或到达文末
+        """
+        total = int(text_widget.index('end-1c').split('.')[0])
+        last = min(last, total)
+        state = self.line_end_state(text_widget, first - 1)
+        line_index = self.document_index(text_widget)
+        while True:
+            old_state = self.line_end_state(text_widget, last)
+            indices = {tag: [] for tag in SYNTAX_TAGS + tuple(SYNTAX_STATE_TAGS.values())}
+            lines = text_widget.get(f'{first}.0', f'{last}.end').split('\n')
+            for line_number, line in enumerate(lines, first):
+                base = line_index.line_start(line_number)
+                spans, state = tokenize_python_line(line, state)
+                for start, end, tag in spans:
+                    indices[tag].append(line_index.index(base + start))
+                    indices[tag].append(line_index.index(base + end))
+            for tag, tag_indices in indices.items():
+                text_widget.tag_remove(tag, f'{first}.0', f'{last}.end+1c')
+                add_tag_ranges(text_widget, tag, tag_indices)
+            if state == old_state or last >= total:
+                break
+            count = max(last - first + 1, SYNTAX_EXTEND_LINES)
+            first, last = last + 1, min(total, last + count * 2)
+
+    # ==================== 文字样式 ====================
+
+    def normalize_style(self, style):
+        """规范化样式属性：去掉空值，字体统一为 [字体名, 字号, ...] 列表，下划线统一为 True"""
+        normalized = {}
+        foreground = style.get('foreground')
+        if foreground:
+            normalized['foreground'] = str(foreground).lower()
+        font = style.get('font')
+        if font:
+            parts = list(font) if isinstance(font, (list, tuple)) else list(self.root.tk.splitlist(str(font)))
+            normalized['font'] = [int(part) if isinstance(part, str) and part.lstrip('-').isdigit() else part
+                                  for part in parts]
+        underline = style.get('underline')
+        if underline and str(underline).lower() not in ('0', 'false'):
+            normalized['underline'] = True
+        return normalized
+
+    def intern_style(self, style):
+        """登记样式，属性相同的样式返回同一个样式id"""
+        style = self.normalize_style(style)
+        key = json.dumps(style, sort_keys=True, ensure_ascii=False)
+        style_id = self.style_ids.get(key)
+        if style_id is None:
+            style_id = len(self.styles) + 1
+            self.style_ids[key] = style_id
+            self.styles[style_id] = style
+        return style_id
+
+    def style_tag(self, style_id, text_widget=None):
+        """返回样式id对应的共享标签名，并在文本组件上配置该标签"""
+        text_widget = text_widget or self.text_editor
+        style = self.styles[style_id]
+        options = {}
+        if 'foreground' in style:
+            options['foreground'] = style['foreground']
+        if 'font' in style:
+            options['font'] = tuple(style['font'])
+        if 'underline' in style:
+            options['underline'] = True
+        tag_name = f'style_{style_id}'
+        text_widget.tag_config(tag_name, **options)
+        return tag_name
+
+    def tag_style(self, text_widget, tag_name):
+        """读取格式标签的样式：共享标签直接查注册表，旧标签从标签配置读取"""
+        if tag_name.startswith('style_'):
+            try:
+                return self.styles[int(tag_name[len('style_'):])]
+            except (ValueError, KeyError):
+                pass
+        return self.normalize_style({attr: text_widget.tag_cget(tag_name, attr) for attr in STYLE_ATTRIBUTES})
+
+    def apply_style(self, start, end, style, text_widget=None):
+        """将样式应用到范围，返回使用的共享标签名
+
+        范围内已有的格式标签若设置了相同属性，先从范围内移除，其余属性改用对应的共享标签保留，
+        因此同一属性不会有两个标签重叠，显示结果与标签优先级无关
+        """
+        text_widget = text_widget or self.text_editor
+        style = self.normalize_style(style)
+        if not style:
+            return None
+        style_id = self.intern_style(style)
+        start_key, end_key = text_index_key(start), text_index_key(end)
+
+        for tag_name in text_widget.tag_names():
+            if not tag_name.startswith(FORMAT_TAG_PREFIXES):
+                continue
+            old_style = self.tag_style(text_widget, tag_name)
+            if not old_style.keys() & style.keys():
+                continue
+            # 标签与范围相交的部分
+            ranges = text_widget.tag_ranges(tag_name)
+            overlaps = []
+            for i in range(0, len(ranges) - 1, 2):
+                range_start = max(text_index_key(ranges[i]), start_key)
+                range_end = min(text_index_key(ranges[i + 1]), end_key)
+                if range_start < range_end:
+                    overlaps.append((range_start, range_end))
+            if not overlaps:
+                continue
+            text_widget.tag_remove(tag_name, start, end)
+            remaining = {key: value for key, value in old_style.items() if key not in style}
+            if remaining:
+                remaining_tag = self.style_tag(self.intern_style(remaining), text_widget)
+                add_tag_ranges(text_widget, remaining_tag,
+                               ['%d.%d' % position for overlap in overlaps for position in overlap])
+
+        tag_name = self.style_tag(style_id, text_widget)
+        text_widget.tag_add(tag_name, start, end)
+        self.style_run_indexes.pop(str(text_widget), None)
+        return tag_name
+
+    def document_style_runs(self, text_widget=None):
+        """返回文本组件格式标签的有序样式段索引（样式id为注册表id），编辑文本时增量更新，格式变化后重新读取"""
+        text_widget = text_widget or self.text_editor
+        widget_name = str(text_widget)
+        style_runs = self.style_run_indexes.get(widget_name)
+        if style_runs is None:
+            line_index = self.document_index(text_widget)
+            spans = []
+            for tag_name in text_widget.tag_names():
+                if not tag_name.startswith(FORMAT_TAG_PREFIXES):
+                    continue
+                ranges = text_widget.tag_ranges(tag_name)
+                if not ranges:
+                    continue
+                style = self.tag_style(text_widget, tag_name)
+                if not style:
+                    continue
+                style_id = self.intern_style(style)
+                for i in range(0, len(ranges) - 1, 2):
+                    spans.append((line_index.offset(ranges[i]), line_index.offset(ranges[i + 1]), style_id))
+            # 旧标签与共享标签可能对应同一样式，合并后每种样式只保留最少的区间
+            style_runs = StyleRuns(coalesce_runs(spans))
+            self.style_run_indexes[widget_name] = style_runs
+        return style_runs
+
+    def collect_style_runs(self, text_widget):
+        """读取文本组件的格式，返回 (样式段数组, 样式表)
+
+        样式段数组为 [偏移, 长度, 样式表下标, ...]，偏移按文本字符计算；样式表只包含用到的样式
+        """
+        table = []
+        positions = {}  # 注册表样式id -> 样式表中的下标
+        spans = []
+        for start, end, style_id in self.document_style_runs(text_widget).spans():
+            if style_id not in positions:
+                positions[style_id] = len(table)
+                table.append(self.styles[style_id])
+            spans.append((start, end, positions[style_id]))
+        return pack_style_runs(spans), table
+
+    def restore_style_runs(self, text_widget, style_runs, styles, line_index):
+        """恢复样式段：每种样式只配置一次共享标签，并用一次 tag add 添加该样式的全部范围"""
+        tags = []
+        for style in styles:
+            style = self.normalize_style(style)
+            tags.append(self.style_tag(self.intern_style(style), text_widget) if style else None)
+        add_style_run_tags(text_widget, style_runs, tags, line_index)
+        self.style_run_indexes.pop(str(text_widget), None)
+
+    def tab_style_runs(self, tab_data):
+        """返回标签页的 (样式段数组, 样式表)，旧版本数据的 color_ranges 在此转换"""
+        if 'style_runs' in tab_data:
+            return tab_data['style_runs'], tab_data.get('styles', [])
+        return legacy_style_runs(tab_data.get('color_ranges', []), tab_data.get('styles'),
+                                 LineIndex(tab_data.get('content', '')))
+
+    # ==================== 行首偏移索引 ====================
+
+    def document_index(self, text_widget=None):
+        """返回文本组件当前内容的行首偏移表，高亮、查找、剪贴板与保存都经由它在偏移与 Tk 索引之间换算"""
+        text_widget = text_widget or self.text_editor
+        widget_name = str(text_widget)
+        line_index = self.line_indexes.get(widget_name)
+        if line_index is None:
+            embedded = [index for _key, _value, index in text_widget.dump('1.0', tk.END, image=True, window=True)]
+            line_index = LineIndex(text_widget.get('1.0', tk.END), embedded)
+            self.line_indexes[widget_name] = line_index
+        return line_index
+
+    def invalidate_document_index(self, text_widget=None):
+        """丢弃行首偏移表，批量修改文本前调用，避免逐次增量更新"""
+        self.line_indexes.pop(str(text_widget or self.text_editor), None)
+
+    def install_edit_hook(self, text_widget):
+        """用 Tcl 过程包装文本组件命令：键盘输入与代码调用的编辑都会通知编辑器，以增量更新行首偏移表
+
+        原命令改名为 <路径名>_orig。规范化的起止索引在 Tcl 中算好（与 Tk 删除到 end 时的处理一致），
+        命令成功执行后只回调一次 text_edited；执行出错时 Tcl 错误照常返回给调用者，且不会回调
+        """
+        if self._edit_hook_command is None:
+            self._edit_hook_command = self.root.register(self.text_edited)
+        widget_name = str(text_widget)
+        original = widget_name + '_orig'
+        text_widget.tk.call('rename', widget_name, original)
+        script = (
+            'proc WIDGET {args} {\n'
+            '    switch -- [lindex $args 0] {\n'
+            '        insert {\n'
+            '            if {[llength $args] < 3 || [ORIGINAL cget -state] ne "normal"} {\n'
+            '                return [uplevel 1 [list ORIGINAL {*}$args]]\n'
+            '            }\n'
+            '            set start [ORIGINAL index [lindex $args 1]]\n'
+            '            if {[ORIGINAL compare $start == end]} {set start [ORIGINAL index end-1c]}\n'
+            '            set text ""\n'
+            '            set tags {}\n'
+            '            foreach {chars tag_list} [lrange $args 2 end] {\n'
+            '                append text $chars\n'
+            '                lappend tags {*}$tag_list\n'
+            '            }\n'
+            '            # 不带标签列表时插入的文本沿用两侧共有的标签，否则只带列出的标签\n'
+            '            set operation [expr {[llength $args] == 3 ? "insert" : "insert_tags"}]\n'
+            '            set result [uplevel 1 [list ORIGINAL {*}$args]]\n'
+            '            CALLBACK WIDGET $operation $start $start $text $tags\n'
+            '            return $result\n'
+            '        }\n'
+            '        delete {\n'
+            '            if {[llength $args] < 2 || [ORIGINAL cget -state] ne "normal"} {\n'
+            '                return [uplevel 1 [list ORIGINAL {*}$args]]\n'
+            '            }\n'
+            '            if {[llength $args] > 3} {\n'
+            '                set result [uplevel 1 [list ORIGINAL {*}$args]]\n'
+            '                CALLBACK WIDGET reset {} {} {}\n'
+            '                return $result\n'
+            '            }\n'
+            '            set start [ORIGINAL index [lindex $args 1]]\n'
+            '            if {[llength $args] == 3} {\n'
+            '                set end [ORIGINAL index [lindex $args 2]]\n'
+            '            } else {\n'
+            '                set end [ORIGINAL index "$start +1c"]\n'
+            '            }\n'
+            '            set operation delete\n'
+            '            if {[ORIGINAL compare $start < $end] && [ORIGINAL compare $end == end]} {\n'
+            '                # 与 Tk 一致：保留最后的换行符；从行首删除到 end 时改为删除前一个换行符\n'
+            '                set end [ORIGINAL index end-1c]\n'
+            '                if {$start eq "1.0"} {\n'
+            '                    set operation clear\n'
+            '                } elseif {[string match *.0 $start]} {\n'
+            '                    set start [ORIGINAL index "$start -1c"]\n'
+            '                }\n'
+            '            }\n'
+            '            if {[ORIGINAL compare $start >= $end]} {\n'
+            '                return [uplevel 1 [list ORIGINAL {*}$args]]\n'
+            '            }\n'
+            '            set result [uplevel 1 [list ORIGINAL {*}$args]]\n'
+            '            CALLBACK WIDGET $operation $start $end {}\n'
+            '            return $result\n'
+            '        }\n'
+            '        image - window {\n'
+            '            if {[lindex $args 1] ne "create" || [llength $args] < 3} {\n'
+            '                return [uplevel 1 [list ORIGINAL {*}$args]]\n'
+            '            }\n'
+            '            set start [ORIGINAL index [lindex $args 2]]\n'
+            '            if {[ORIGINAL compare $start == end]} {set start [ORIGINAL index end-1c]}\n'
+            '            set result [uplevel 1 [list ORIGINAL {*}$args]]\n'
+            '            CALLBACK WIDGET embed $start $start {}\n'
+            '            return $result\n'
+            '        }\n'
+            '        replace - edit {\n'
+            '            if {[lindex $args 1] in {undo redo} && [ORIGINAL cget -state] ne "normal"} {\n'
+            '                # 只读期间（如分片插入时）不撤销，避免撤销栈被消耗而文本不变\n'
+            '                return\n'
+            '            }\n'
+            '            set result [uplevel 1 [list ORIGINAL {*}$args]]\n'
+            '            CALLBACK WIDGET [lindex $args 0] [lindex $args 1] {} {}\n'
+            '            return $result\n'
+            '        }\n'
+            '    }\n'
+            '    uplevel 1 [list ORIGINAL {*}$args]\n'
+            '}')
+        for placeholder, value in (('ORIGINAL', original), ('WIDGET', widget_name),
+                                   ('CALLBACK', self._edit_hook_command)):
+            script = script.replace(placeholder, value)
+        text_widget.tk.eval(script)
+        text_widget.bind('<Destroy>', lambda event: self.remove_edit_hook(event, widget_name), add='+')
+
+    def remove_edit_hook(self, event, widget_name):
+        """文本组件销毁时删除包装过程与行首偏移表"""
+        if str(event.widget) != widget_name:
+            return
+        self.line_indexes.pop(widget_name, None)
+        self.style_run_indexes.pop(widget_name, None)
+        self.highlighted_widgets.discard(widget_name)
+        self.highlight_dirty.pop(widget_name, None)
+        try:
+            self.root.tk.call('rename', widget_name, '')
+        except tk.TclError:
+            pass
+
+    def text_edited(self, widget_name, operation, start, end, text, tags=''):
+        """文本组件命令成功执行后调用：按规范化的起止索引增量更新行首偏移表、样式段索引与待高亮的行范围
+
+        operation 为 insert（沿用两侧格式）/insert_tags（tags 为指定的标签）/delete/clear（删除全部文本）/
+        embed（插入嵌入对象），其余（撤销/重做、替换、多范围删除）无法增量更新，相关索引删除后在下次使用时重建
+        """
+        if operation == 'edit' and start not in ('undo', 'redo'):
+            return
+        if operation == 'embed':
+            # 嵌入对象不计入文本偏移，样式段与高亮不受影响
+            line_index = self.line_indexes.get(widget_name)
+            if line_index is not None:
+                line_index.embed(start)
+            return
+        if operation not in ('insert', 'insert_tags', 'delete', 'clear'):
+            self.line_indexes.pop(widget_name, None)
+            self.style_run_indexes.pop(widget_name, None)
+            self.highlighted_widgets.discard(widget_name)
+            self.highlight_dirty.pop(widget_name, None)
+            return
+        line_index = self.line_indexes.get(widget_name)
+        if operation == 'clear':
+            # 只剩最后的换行符，无需读取被删除的文本
+            self.line_indexes[widget_name] = LineIndex('\n')
+            if widget_name in self.style_run_indexes:
+                self.style_run_indexes[widget_name] = StyleRuns([])
+        else:
+            self.edit_style_run_index(widget_name, line_index, operation, start, end, text, tags)
+            if line_index is not None:
+                line_index.edit(start, end, text)
+        if widget_name in self.highlighted_widgets:
+            self.extend_highlight_dirty(widget_name, start, end, text)
+
+    def edit_style_run_index(self, widget_name, line_index, operation, start, end, text, tags):
+        """按编辑的偏移移动或拆分样式段索引（需用编辑前的行首偏移表换算）；插入时带了格式标签则删除索引"""
+        style_runs = self.style_run_indexes.get(widget_name)
+        if style_runs is None:
+            return
+        if line_index is None or (tags and any(tag.startswith(FORMAT_TAG_PREFIXES)
+                                               for tag in self.root.tk.splitlist(tags))):
+            del self.style_run_indexes[widget_name]
+            return
+        offset = line_index.offset(start)
+        if operation == 'delete':
+            style_runs.edit(offset, line_index.offset(end) - offset, 0)
+        else:
+            style_runs.edit(offset, 0, len(text), inherit=operation == 'insert')
+
+    def extend_highlight_dirty(self, widget_name, start, end, text):
+        """把编辑后的行并入待重新高亮的行范围，原范围中编辑位置之后的行号随换行数变化"""
+        start_line = text_index_key(start)[0]
+        end_line = text_index_key(end)[0]
+        new_end_line = start_line + text.count('\n')
+        line_delta = new_end_line - end_line
+
+        def moved(line, inside):
+            if line < start_line:
+                return line
+            return line + line_delta if line > end_line else inside
+
+        first, last = start_line, new_end_line
+        dirty = self.highlight_dirty.get(widget_name)
+        if dirty is not None:
+            first = min(first, moved(dirty[0], start_line))
+            last = max(last, moved(dirty[1], new_end_line))
+        self.highlight_dirty[widget_name] = (first, last)
+
+    # ==================== 图片存储 ====================
+    
+    def register_image_data(self, image_bytes, image_hash=None):
+        """按内容哈希登记图片编码数据，相同图片只保存一份，返回哈希"""
+        if image_hash is None:
+            image_hash = image_digest(image_bytes)
+        if image_hash not in self.image_store:
+            self.image_store[image_hash] = {'data': image_bytes, 'image': None, 'photo': None}
+        return image_hash
     
-    def on_key_release(self, event):
-        self.update_line_numbers()
-        self.update_cursor_position()
-        
-        # Apply syntax highlighting for certain file types
-        if self.filename and (self.filename.endswith('.py') or self.filename.endswith('.pyw')):
-            self.apply_syntax_highlighting()
+    def load_stored_image(self, image_hash):
+        """返回存储中图片的 (PIL图片, PhotoImage)，每张图片只解码一次
+
+        已提交到线程池的图片等待其解码结果，PhotoImage 只在Tk线程上创建
+        """
+        entry = self.image_store[image_hash]
+        if entry['photo'] is None:
+            future = entry.pop('future', None)
+            entry['image'] = future.result() if future else decode_image_bytes(entry['data'])
+            entry['photo'] = ImageTk.PhotoImage(entry['image'])
+        return entry['image'], entry['photo']
     
-    def update_cursor_position(self, event=None):
-        cursor_position = self.text_editor.index(tk.INSERT)
-        line, column = cursor_position.split('.')
-        self.status_bar.config(text=f"行: {line} | 列: {column}")
+    def decode_images_async(self, image_hashes):
+        """将图片解码提交到线程池，并分批在Tk线程上创建PhotoImage"""
+        if self.image_decoder is None:
+            self.image_decoder = ThreadPoolExecutor(max_workers=os.cpu_count() or 4)
+        for image_hash in image_hashes:
+            entry = self.image_store.get(image_hash)
+            if entry is None or entry['photo'] is not None or 'future' in entry:
+                continue
+            entry['future'] = self.image_decoder.submit(decode_image_bytes, entry['data'])
+        if self._photo_batch_id is None:
+            self._photo_batch_id = self.root.after(10, self.create_decoded_photos)
     
-    def update_modified(self, event=None):
-        """更新修改状态"""
-        if self.text_editor.edit_modified():
-            # 更新当前标签页的修改状态
-            if self.tabs and self.current_tab_index < len(self.tabs):
-                current_tab = self.tabs[self.current_tab_index]
-                current_tab['modified'] = True
-                
-                # 标记项目为已修改
-                self.mark_project_modified()
-                
-                # 标签页按钮不显示修改状态，保持原有显示
-                # tab_display = current_tab['title'][0] if current_tab['title'] else str(self.current_tab_index + 1)
-                # current_tab['ui_button'].config(text=tab_display)
-            
-            # 更新窗口标题（现在由update_window_title统一处理）
-            self.update_window_title()
-            # 不要重置edit_modified状态，让它保持为True直到文件被保存
+    def prefetch_tab_images(self, tab_index, radius=1):
+        """在线程池中预先解码指定标签页及前后 radius 个标签页中尚未加载的图片，指定标签页优先"""
+        neighbours = self.tabs[max(0, tab_index - radius):tab_index + radius + 1]
+        ordered_tabs = self.tabs[tab_index:tab_index + 1] + neighbours
+        image_hashes = [img_data['image_ref'] for tab in ordered_tabs
+                        for img_data in tab.get('pending_images', [])]
+        if image_hashes:
+            self.decode_images_async(image_hashes)
     
-    def apply_syntax_highlighting(self):
-        # Clear all tags
-        for tag in ["keyword", "string", "comment", "function", "number"]:
-            self.text_editor.tag_remove(tag, "1.0", tk.END)
-        
-        # Define patterns for Python syntax
-        patterns = [
-            (r'\b(False|None|True|and|as|assert|async|await|break|class|continue|def|del|elif|else|except|finally|for|from|global|if|import|in|is|lambda|nonlocal|not|or|pass|raise|return|try|while|with|yield)\b', 'keyword'),
-            (r'"""[\s\S]*?"""', 'string'),
-            (r"'''[\s\S]*?'''", 'string'),
-            (r'"[^"\\]*(\\.[^"\\]*)*"', 'string'),
-            (r"'[^'\\]*(\\.[^'\\]*)*'", 'string'),
-            (r'#.*$', 'comment'),
-            (r'\b[A-Za-z_][A-Za-z0-9_]*(?=\s*\()', 'function'),
-            (r'\b\d+\b', 'number'),
-        ]
-        
-        content = self.text_editor.get("1.0", tk.END)
-        for pattern, tag in patterns:
-            for match in re.finditer(pattern, content, re.MULTILINE):
-                start = "1.0 + %dc" % match.start()
-                end = "1.0 + %dc" % match.end()
-                self.text_editor.tag_add(tag, start, end)
-        # 语法高亮完成后，提升自定义颜色标签优先级，避免被覆盖
-        for tag_name in self.text_editor.tag_names():
-            if tag_name.startswith('color_'):
-                self.text_editor.tag_raise(tag_name)
+    def create_decoded_photos(self, batch_size=8):
+        """每次为最多 batch_size 张已解码完成的图片创建PhotoImage，其余留到下一轮，避免长时间阻塞界面"""
+        self._photo_batch_id = None
+        created = 0
+        pending = False
+        for image_hash, entry in list(self.image_store.items()):
+            future = entry.get('future')
+            if future is None:
+                continue
+            if not future.done() or created >= batch_size:
+                pending = True
+                continue
+            try:
+                self.load_stored_image(image_hash)
+            except Exception as e:
+                entry.pop('future', None)
+                print(f"解码图片时出错: {e}")
+            created += 1
+        if pending:
+            self._photo_batch_id = self.root.after(1 if created else 10, self.create_decoded_photos)
+    
+    def cache_image_encoding(self, image_info, image_hash):
+        """在图片信息中缓存其编码字节，记录缓存对应的PIL图片对象"""
+        image_info['image_hash'] = image_hash
+        image_info['encoded'] = self.image_store[image_hash]['data']
+        image_info['encoded_source'] = image_info['original_image']
+    
+    def encode_image_info(self, image_info):
+        """返回图片的内容哈希，编码字节（通常为插入时的原始文件字节）缓存在图片信息中
+        
+        只有在插入后图片对象被替换（缓存对应的不再是当前图片）时才重新编码PNG
+        """
+        original_image = image_info['original_image']
+        if image_info.get('encoded') is not None and image_info.get('encoded_source') is original_image:
+            return image_info['image_hash']
+        
+        buffer = BytesIO()
+        original_image.save(buffer, format='PNG')
+        image_hash = self.register_image_data(buffer.getvalue())
+        self.cache_image_encoding(image_info, image_hash)
+        return image_hash
     
     # ==================== 项目管理功能 ====================
     
     def export_project_data(self):
         """导出项目数据结构"""
-        # 保存当前标签页状态
-        self.save_current_tab_state()
+        # 同步所有标签页状态（包括缓存池中未激活的文本组件）
+        self.sync_all_tab_states()
         
         import datetime
         import time
         
         project_data = {
-            "version": "1.0",
+            "version": "2.0",
             "project_name": self.project_name,
             "created_time": datetime.datetime.now().isoformat(),
             "modified_time": datetime.datetime.now().isoformat(),
             "current_tab_index": self.current_tab_index,
-            "tabs": []
+            "tabs": [],
+            "image_store": {}
         }
         
         # 导出所有标签页数据
         for tab in self.tabs:
+            content, style_runs = self.tab_text_state(tab)
             tab_data = {
                 "id": tab['id'],
                 "title": tab['title'],
                 "filename": tab['filename'],
-                "content": tab['content'],
+                "content": content,
                 "images": [],
                 "image_info": {},
                 "modified": tab['modified'],
                 "cursor_pos": tab['cursor_pos'],
                 "custom_color": tab['custom_color'],
-                    "color_ranges": tab.get('color_ranges', [])
+                "style_runs": style_runs,
+                "styles": tab.get('styles', []),
+                "revision": tab.get('revision', 0)
             }
             
             # 处理图片信息
-            if 'image_info' in tab and tab['image_info']:
+            if not tab.get('hydrated', True):
+                # 尚未激活过的标签页直接沿用导入时的图片条目，无需解码
+                for img_data in tab.get('pending_images', []):
+                    image_hash = img_data['image_ref']
+                    project_data['image_store'][image_hash] = self.image_store[image_hash]['data']
+                    tab_data['images'].append(dict(img_data))
+            elif 'image_info' in tab and tab['image_info']:
                 for image_name, image_info in tab['image_info'].items():
                     try:
-                        # 将图片转换为base64
-                        original_image = image_info['original_image']
-                        buffer = BytesIO()
-                        original_image.save(buffer, format='PNG')
-                        image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+                        # 图片按内容哈希引用，相同图片只写入一次
+                        image_hash = self.encode_image_info(image_info)
+                        project_data['image_store'][image_hash] = image_info['encoded']
                         
                         image_data = {
                             'name': image_name,
                             'file_path': image_info['file_path'],
-                            'image_data': image_base64,
+                            'image_ref': image_hash,
                             'draggable': image_info['draggable']
                         }
                         
@@ -2598,11 +4810,6 @@ class TopMostEditor:
         try:
             import time
             
-            # 清空当前所有标签页
-            for tab in self.tabs:
-                if tab.get('ui_button'):
-                    tab['ui_button'].destroy()
-            
             # 清理浮动图片
             if hasattr(self, 'floating_images'):
                 for image_label in self.floating_images.values():
@@ -2613,10 +4820,18 @@ class TopMostEditor:
                 self.floating_images.clear()
             
             # 重置标签页列表和索引
+            self.reset_text_pool()
             self.tabs = []
+            self.dirty_tab_ids = set()
+            self.hibernation_savings = {}
             self.tab_counter = 0
             self.current_tab_index = 0
             
+            # 重置图片存储，并登记项目中按哈希存放的图片
+            self.image_store = {}
+            for image_hash, image_bytes in project_data.get('image_store', {}).items():
+                self.register_image_data(image_bytes, image_hash)
+            
             # 恢复项目信息
             self.project_name = project_data.get('project_name', '未命名项目')
             target_tab_index = project_data.get('current_tab_index', 0)
@@ -2625,7 +4840,8 @@ class TopMostEditor:
             for tab_data in project_data.get('tabs', []):
                 self.tab_counter += 1
                 
-                # 创建标签页数据结构
+                # 创建标签页数据结构（旧版本的 color_ranges 转换为样式段）
+                style_runs, styles = self.tab_style_runs(tab_data)
                 new_tab = {
                     'id': tab_data.get('id', self.tab_counter),
                     'title': tab_data.get('title', f'标签页{self.tab_counter}'),
@@ -2636,49 +4852,24 @@ class TopMostEditor:
                     'modified': False,  # 导入后所有标签页都应该是未修改状态
                     'cursor_pos': tab_data.get('cursor_pos', '1.0'),
                     'custom_color': tab_data.get('custom_color'),
-                    'color_ranges': tab_data.get('color_ranges', [])
+                    'style_runs': style_runs,
+                    'styles': styles,
+                    'revision': 0,
+                    # 延迟加载：图片只记录引用，首次切换到该标签页时才解码
+                    'hydrated': False,
+                    'pending_images': []
                 }
+                # 新建标签页的id不能与导入的id重复
+                self.tab_counter = max(self.tab_counter, new_tab['id'])
                 
-                # 恢复图片信息
+                # 记录图片引用（旧版1.0项目的base64在此登记到图片存储，但不解码图片）
                 for img_data in tab_data.get('images', []):
                     try:
-                        # 从base64恢复图片
-                        image_base64 = img_data['image_data']
-                        image_bytes = base64.b64decode(image_base64)
-                        image = Image.open(BytesIO(image_bytes))
-                        
-                        # 创建PhotoImage
-                        photo = ImageTk.PhotoImage(image)
-                        
-                        image_name = img_data.get('name', f"image_{int(time.time() * 1000000)}")
-                        
-                        # 保存图片信息到标签页
-                        new_tab['images'].append(photo)
-                        
-                        # 根据图片类型设置不同的属性
-                        image_info = {
-                            'photo': photo,
-                            'draggable': img_data.get('draggable', False),
-                            'file_path': img_data.get('file_path', ''),
-                            'original_image': image
-                        }
-                        
-                        if img_data.get('type') == 'floating':
-                            # 浮动图片
-                            image_info.update({
-                                'is_floating': True,
-                                'x': img_data.get('x', 10),
-                                'y': img_data.get('y', 10)
-                            })
-                        else:
-                            # 嵌入式图片
-                            image_info.update({
-                                'x_offset': img_data.get('x_offset', 0),
-                                'y_offset': img_data.get('y_offset', 0)
-                            })
-                        
-                        new_tab['image_info'][image_name] = image_info
-                        
+                        pending = {key: value for key, value in img_data.items() if key != 'image_data'}
+                        if 'image_ref' not in pending:
+                            pending['image_ref'] = self.register_image_data(base64.b64decode(img_data['image_data']))
+                        pending.setdefault('name', f"image_{int(time.time() * 1000000)}_{len(new_tab['pending_images'])}")
+                        new_tab['pending_images'].append(pending)
                     except Exception as e:
                         print(f"恢复图片时出错: {e}")
                 
@@ -2693,13 +4884,16 @@ class TopMostEditor:
                 self.create_new_tab("新建文档")
                 target_tab_index = 0
             
+            # 只预先解码目标标签页及相邻标签页的图片，其余标签页首次激活时再解码
+            self.prefetch_tab_images(target_tab_index)
+            
             # 切换到目标标签页（避免保存当前状态，因为是导入过程）
             if target_tab_index < len(self.tabs):
                 # 直接设置索引，不调用switch_to_tab避免保存当前状态
                 self.current_tab_index = target_tab_index
                 current_tab = self.tabs[target_tab_index]
                 self.update_tab_ui_states()
-                self.load_tab_content(current_tab)
+                self.activate_tab_widget(current_tab)
                 self.filename = current_tab['filename']
                 self.update_window_title()
             else:
@@ -2707,7 +4901,7 @@ class TopMostEditor:
                 self.current_tab_index = 0
                 current_tab = self.tabs[0]
                 self.update_tab_ui_states()
-                self.load_tab_content(current_tab)
+                self.activate_tab_widget(current_tab)
                 self.filename = current_tab['filename']
                 self.update_window_title()
             
@@ -2720,15 +4914,19 @@ class TopMostEditor:
             self.show_message("错误", f"导入项目数据时出错: {str(e)}", "error")
             return False
     
-    def save_project(self):
+    def save_project(self, background=True):
         """保存项目"""
+        if self.chunk_insert_pending():
+            return False
         if self.project_filename:
-            return self.save_project_to_file(self.project_filename)
+            return self.save_project_to_file(self.project_filename, background)
         else:
-            return self.save_project_as()
+            return self.save_project_as(background)
     
-    def save_project_as(self):
+    def save_project_as(self, background=True):
         """项目另存为"""
+        if self.chunk_insert_pending():
+            return False
         file_path = filedialog.asksaveasfilename(
             title="保存项目",
             defaultextension=".rtep",
@@ -2739,44 +4937,214 @@ class TopMostEditor:
         )
         
         if file_path:
-            if self.save_project_to_file(file_path):
-                self.project_filename = file_path
-                self.project_name = os.path.splitext(os.path.basename(file_path))[0]
-                self.update_window_title()
-                return True
+            # 保存成功后才将项目关联到新文件
+            return self.save_project_to_file(file_path, background, bind=True)
         return False
     
-    def save_project_to_file(self, file_path):
-        """保存项目到指定文件"""
+    def save_project_to_file(self, file_path, background=True, bind=False):
+        """保存项目到指定文件
+        
+        在Tk线程上快照标签页状态，序列化和写入（临时文件 + os.replace）在后台线程完成，
+        结果通过 root.after 轮询回到界面。background=False 时在当前线程完成写入（用于退出前保存）。
+        bind 为真时（另存为）写入成功后项目才关联到该文件
+        """
+        if self.project_save_thread is not None:
+            if not background:
+                self.wait_for_project_save()
+            else:
+                # 已有保存在进行中，结束后再保存一次最新状态
+                self.project_save_again = (file_path, bind)
+                return True
+        
         try:
+            # 快照：标签页内容为不可变字符串，图片为已缓存的编码字节，后台线程可安全读取
             project_data = self.export_project_data()
-            
-            with open(file_path, 'w', encoding='utf-8') as file:
-                json.dump(project_data, file, ensure_ascii=False, indent=2)
-            
-            # 重置项目修改状态
-            self.project_modified = False
-            
-            # 重置所有标签页的修改状态
-            for tab in self.tabs:
-                tab['modified'] = False
-            
-            # 重置当前文本编辑器的修改状态
-            if hasattr(self, 'text_editor') and self.text_editor.winfo_exists():
-                self.text_editor.edit_modified(False)
-            
-            # 更新窗口标题
-            self.update_window_title()
-            
-            self.show_message("成功", f"项目已保存到: {file_path}", "info")
-            return True
-            
         except Exception as e:
             self.show_message("错误", f"保存项目时出错: {str(e)}", "error")
             return False
+        
+        # 快照后立即清除修改标记，保存期间的新编辑会重新标记；保存失败时恢复
+        self.project_save_job = {
+            'file_path': file_path,
+            'bind': bind,
+            'modified_tabs': [tab for tab in self.tabs if tab['modified']],
+            'project_modified': self.project_modified
+        }
+        self.clear_project_modified()
+        
+        # 追加日志模式：文件仍是上次写入的样子时只追加变化的数据块
+        journal_layout = None
+        if self.settings['project_journal'] and self.project_layout \
+                and self.project_layout['file_path'] == file_path:
+            try:
+                if os.path.getsize(file_path) == self.project_layout['file_size']:
+                    journal_layout = self.project_layout
+            except OSError:
+                pass
+        
+        if not background:
+            try:
+                layout = self.write_project_snapshot(file_path, project_data, journal_layout)
+            except Exception as e:
+                self.finish_project_save(str(e))
+                return False
+            self.finish_project_save(None, layout)
+            return True
+        
+        self.project_save_queue = queue.Queue()
+        self.project_save_thread = threading.Thread(
+            target=self.project_save_worker,
+            args=(file_path, project_data, journal_layout, self.project_save_queue),
+            daemon=True
+        )
+        self.project_save_thread.start()
+        self.status_bar.config(text="正在保存项目...")
+        self.root.after(50, self.poll_project_save)
+        return True
+    
+    def write_project_snapshot(self, file_path, project_data, journal_layout=None, progress=None):
+        """写入项目快照：完整写入时原子替换，追加日志时只追加变化部分并在需要时压实，返回文件布局"""
+        codec = COMPRESSION_CODECS.get(self.settings['compression'], CODEC_RAW)
+        level = self.settings['compression_level']
+        if journal_layout is None:
+            return write_project_file_atomic(file_path, project_data, progress, codec, level)
+        
+        layout = write_project_container(file_path, project_data, progress, journal_layout, codec, level)
+        if journal_needs_compaction(layout, self.settings['journal_compact_ratio'],
+                                    self.settings['journal_compact_min_bytes']):
+            if progress:
+                progress(0, 0)
+            layout = compact_project_file(file_path, layout, codec, level)
+        return layout
+    
+    def project_save_worker(self, file_path, project_data, journal_layout, result_queue):
+        """后台线程：序列化并写入项目文件"""
+        try:
+            layout = self.write_project_snapshot(
+                file_path, project_data, journal_layout,
+                progress=lambda done, total: result_queue.put(('progress', done, total))
+            )
+            result_queue.put(('done', layout))
+        except Exception as e:
+            result_queue.put(('error', str(e)))
+    
+    def poll_project_save(self):
+        """在Tk线程上轮询后台保存的进度与结果"""
+        if self.project_save_queue is None:
+            return
+        
+        result = None
+        try:
+            while True:
+                message = self.project_save_queue.get_nowait()
+                if message[0] == 'progress':
+                    _, done, total = message
+                    if total:
+                        self.status_bar.config(text=f"正在保存项目... {done * 100 // total}%")
+                    else:
+                        self.status_bar.config(text="正在压实项目日志...")
+                else:
+                    result = message
+        except queue.Empty:
+            pass
+        
+        if result is None:
+            self.root.after(50, self.poll_project_save)
+            return
+        
+        self.project_save_thread.join()
+        self.project_save_thread = None
+        self.project_save_queue = None
+        if result[0] == 'error':
+            self.finish_project_save(result[1])
+        else:
+            self.finish_project_save(None, result[1])
+        
+        # 保存期间再次请求了保存
+        if self.project_save_again:
+            file_path, bind = self.project_save_again
+            self.project_save_again = None
+            if not bind:
+                # 普通保存写入项目当前关联的文件（之前的另存为可能刚刚成功）
+                file_path = self.project_filename or file_path
+            self.save_project_to_file(file_path, bind=bind)
+    
+    def wait_for_project_save(self):
+        """阻塞等待进行中的后台保存完成（退出前调用）"""
+        if self.project_save_thread is None:
+            return
+        self.project_save_thread.join()
+        result = None
+        while True:
+            try:
+                message = self.project_save_queue.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] != 'progress':
+                result = message
+        self.project_save_thread = None
+        self.project_save_queue = None
+        self.project_save_again = None
+        if result and result[0] == 'done':
+            self.finish_project_save(None, result[1])
+        else:
+            self.finish_project_save(result[1] if result else "后台保存未完成")
+    
+    def finish_project_save(self, error, layout=None):
+        """处理保存结果：成功时记录文件布局并提示，失败时恢复保存前的修改标记"""
+        job = self.project_save_job
+        self.project_save_job = None
+        if job is None:
+            return
+        
+        # 失败后文件状态未知，下次保存完整重写
+        self.project_layout = layout
+        
+        if error is None:
+            if job['bind']:
+                # 另存为成功，项目此后保存到新文件
+                self.project_filename = job['file_path']
+                self.project_name = os.path.splitext(os.path.basename(job['file_path']))[0]
+                self.update_window_title()
+            # 项目已完整保存，之前的恢复快照不再需要
+            if not self.dirty_tab_ids:
+                self.discard_recovery_session()
+            self.status_bar.config(text=f"项目已保存: {os.path.basename(job['file_path'])}")
+            self.show_message("成功", f"项目已保存到: {job['file_path']}", "info")
+            return
+        
+        # 保存失败：恢复修改标记，避免误以为已保存
+        for tab in job['modified_tabs']:
+            if tab in self.tabs:
+                self.set_tab_modified(tab, True)
+                if self.tabs.index(tab) == self.current_tab_index:
+                    self.text_editor.edit_modified(True)
+        if job['project_modified']:
+            self.project_modified = True
+        self.update_window_title()
+        self.status_bar.config(text="项目保存失败")
+        self.show_message("错误", f"保存项目时出错: {error}", "error")
+    
+    def clear_project_modified(self):
+        """清除项目及所有标签页的修改状态"""
+        # 重置项目修改状态
+        self.project_modified = False
+        
+        # 重置所有标签页的修改状态
+        for tab in self.tabs:
+            self.set_tab_modified(tab, False)
+        
+        # 重置当前文本编辑器的修改状态
+        if hasattr(self, 'text_editor') and self.text_editor.winfo_exists():
+            self.text_editor.edit_modified(False)
+        
+        # 更新窗口标题
+        self.update_window_title()
     
     def open_project(self):
         """打开项目文件"""
+        if self.chunk_insert_pending():
+            return
         if self.check_project_changes():
             file_path = filedialog.askopenfilename(
                 title="打开项目",
@@ -2788,10 +5156,10 @@ class TopMostEditor:
             
             if file_path:
                 try:
-                    with open(file_path, 'r', encoding='utf-8') as file:
-                        project_data = json.load(file)
+                    project_data = load_project_data(file_path)
                     
                     if self.import_project_data(project_data):
+                        self.project_layout = project_data.get('layout')
                         self.project_filename = file_path
                         self.project_name = os.path.splitext(os.path.basename(file_path))[0]
                         self.project_modified = False
@@ -2801,12 +5169,97 @@ class TopMostEditor:
                 except Exception as e:
                     self.show_message("错误", f"打开项目时出错: {str(e)}", "error")
     
+    def open_project_partial(self):
+        """只打开项目中选中的标签页；打开后需另存为新项目，避免覆盖原项目中未加载的标签页"""
+        if self.chunk_insert_pending():
+            return
+        if not self.check_project_changes():
+            return
+        file_path = filedialog.askopenfilename(
+            title="打开项目中的部分标签页",
+            filetypes=[
+                ("富文本编辑器项目", "*.rtep"),
+                ("所有文件", "*.*")
+            ]
+        )
+        if not file_path:
+            return
+        
+        try:
+            summary = peek_project_file(file_path)
+        except Exception as e:
+            self.show_message("错误", f"读取项目清单时出错: {str(e)}", "error")
+            return
+        if not summary['tabs']:
+            self.show_message("提示", "该项目中没有标签页", "info")
+            return
+        
+        tab_ids = self.select_project_tabs_dialog(file_path, summary)
+        if not tab_ids:
+            return
+        
+        try:
+            project_data = load_project_data(file_path, set(tab_ids))
+            if self.import_project_data(project_data):
+                # 部分打开的项目没有对应文件，保存时会要求另存为
+                self.project_layout = None
+                self.project_filename = None
+                self.project_name = os.path.splitext(os.path.basename(file_path))[0] + "（部分）"
+                self.project_modified = True
+                self.update_window_title()
+                self.status_bar.config(text=f"已打开 {len(tab_ids)}/{len(summary['tabs'])} 个标签页")
+        except Exception as e:
+            self.show_message("错误", f"打开项目时出错: {str(e)}", "error")
+    
+    def select_project_tabs_dialog(self, file_path, summary):
+        """列出项目清单中的标签页供选择，返回选中的标签页id列表（取消时为空）"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title(f"选择标签页 - {os.path.basename(file_path)}")
+        dialog.attributes('-topmost', True)
+        self.position_dialog_next_to_main(dialog, 420, 360)
+        
+        tk.Label(dialog, text=f"共 {len(summary['tabs'])} 个标签页，选择要打开的标签页:").pack(anchor='w', padx=10, pady=(10, 0))
+        
+        list_frame = tk.Frame(dialog)
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        tab_listbox = tk.Listbox(list_frame, selectmode=tk.EXTENDED, height=12)
+        scrollbar = tk.Scrollbar(list_frame, orient=tk.VERTICAL, command=tab_listbox.yview)
+        tab_listbox.config(yscrollcommand=scrollbar.set)
+        tab_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        for index, tab_info in enumerate(summary['tabs']):
+            chars = tab_info['chars'] if tab_info['chars'] is not None else '?'
+            size_kb = tab_info['bytes'] / 1024
+            tab_listbox.insert(tk.END, f"{tab_info['title']}  ({chars} 字, {tab_info['image_count']} 图, {size_kb:.1f} KB)")
+            if tab_info['custom_color']:
+                try:
+                    tab_listbox.itemconfig(index, bg=tab_info['custom_color'])
+                except tk.TclError:
+                    pass
+        tab_listbox.selection_set(0, tk.END)
+        
+        selected_ids = []
+        
+        def confirm():
+            selected_ids.extend(summary['tabs'][index]['id'] for index in tab_listbox.curselection())
+            dialog.destroy()
+        
+        button_frame = tk.Frame(dialog)
+        button_frame.pack(pady=10)
+        tk.Button(button_frame, text="全选", command=lambda: tab_listbox.selection_set(0, tk.END)).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="打开所选", command=confirm).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="取消", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
+        tab_listbox.bind('<Double-Button-1>', lambda event: confirm())
+        
+        dialog.transient(self.root)
+        dialog.grab_set()
+        self.root.wait_window(dialog)
+        return selected_ids
+    
     def check_project_changes(self):
         """检查项目是否有未保存的更改"""
-        # 检查是否有标签页被修改
-        has_modified_tabs = any(tab.get('modified', False) for tab in self.tabs)
-        
-        if has_modified_tabs or self.project_modified:
+        if self.has_unsaved_changes():
             response = messagebox.askyesnocancel(
                 "未保存的更改", 
                 "当前项目有未保存的更改，是否保存？"
@@ -2814,18 +5267,42 @@ class TopMostEditor:
             if response is None:  # Cancel
                 return False
             elif response:  # Yes
-                return self.save_project()
+                # 退出或打开其他项目前必须确认写入完成，因此同步保存
+                return self.save_project(background=False)
         return True
     
+    def set_tab_modified(self, tab_data, modified):
+        """设置标签页的修改标记，只在标记变化时更新脏标签页集合并安排刷新窗口标题"""
+        tab_data['modified'] = modified
+        if modified == (tab_data['id'] in self.dirty_tab_ids):
+            return
+        if modified:
+            self.dirty_tab_ids.add(tab_data['id'])
+        else:
+            self.dirty_tab_ids.discard(tab_data['id'])
+        self.schedule_title_update()
+    
+    def has_unsaved_changes(self):
+        """项目或任一标签页是否有未保存的更改"""
+        return bool(self.dirty_tab_ids) or self.project_modified
+    
+    def schedule_title_update(self):
+        """同一空闲周期内的多次状态变化只刷新一次窗口标题"""
+        if self._title_update_id is None:
+            self._title_update_id = self.root.after_idle(self.update_window_title)
+    
     def update_window_title(self):
         """更新窗口标题"""
+        self._title_update_id = None
         title = f"缓冲编辑器（强制置顶） - {self.project_name}"
         
         # 检查是否有未保存的更改
-        has_changes = any(tab.get('modified', False) for tab in self.tabs) or self.project_modified
-        if has_changes:
+        if self.has_unsaved_changes():
             title = '*' + title
         
+        if title == self._window_title:
+            return
+        self._window_title = title
         self.root.title(title)
         if hasattr(self, 'title_label'):
             self.title_label.config(text=title)
@@ -2834,7 +5311,258 @@ class TopMostEditor:
         """标记项目为已修改"""
         if not self.project_modified:
             self.project_modified = True
-            self.update_window_title()
+            self.schedule_title_update()
+    
+    # ==================== 自动保存与崩溃恢复 ====================
+    
+    def schedule_autosave(self):
+        """编辑后延迟写入恢复快照，连续输入时只在停顿后写一次"""
+        if not self.settings['autosave_enabled']:
+            return
+        if self._autosave_id is not None:
+            self.root.after_cancel(self._autosave_id)
+        self._autosave_id = self.root.after(self.settings['autosave_delay_ms'], self.run_autosave)
+    
+    def run_autosave(self):
+        """在Tk线程上收集有变化的标签页快照，交给后台线程写入恢复目录"""
+        self._autosave_id = None
+        if self.autosave_thread is not None or self.chunk_insert_job is not None:
+            # 上一次快照仍在写入，或正在分片插入，稍后再试
+            self.schedule_autosave()
+            return
+        
+        self.sync_all_tab_states()
+        
+        # 只写入自上次快照以来有变化的标签页
+        tab_snapshots = []
+        image_blobs = {}
+        for tab in self.tabs:
+            if tab.get('revision', 0) == tab.get('autosaved_revision', 0):
+                continue
+            content, style_runs = self.tab_text_state(tab)
+            snapshot = {
+                'id': tab['id'],
+                'title': tab['title'],
+                'filename': tab['filename'],
+                'custom_color': tab.get('custom_color'),
+                'content': content,
+                'style_runs': style_runs,
+                'styles': tab.get('styles', []),
+                'images': []
+            }
+            if not tab.get('hydrated', True):
+                for img_data in tab.get('pending_images', []):
+                    image_blobs[img_data['image_ref']] = self.image_store[img_data['image_ref']]['data']
+                    snapshot['images'].append(dict(img_data))
+            else:
+                for image_name, image_info in tab.get('image_info', {}).items():
+                    try:
+                        image_hash = self.encode_image_info(image_info)
+                    except Exception as e:
+                        print(f"自动保存图片时出错: {e}")
+                        continue
+                    image_blobs[image_hash] = image_info['encoded']
+                    snapshot['images'].append({
+                        'name': image_name,
+                        'file_path': image_info.get('file_path', ''),
+                        'image_ref': image_hash,
+                        'draggable': image_info.get('draggable', False),
+                        'type': 'embedded'
+                    })
+            tab_snapshots.append(snapshot)
+            tab['autosaved_revision'] = tab.get('revision', 0)
+            self.recovery_tab_ids.add(tab['id'])
+        
+        if not tab_snapshots:
+            return
+        
+        # 已关闭的标签页不再保留恢复数据
+        self.recovery_tab_ids &= {tab['id'] for tab in self.tabs}
+        session_info = {
+            'project_name': self.project_name,
+            'project_filename': self.project_filename,
+            'tab_ids': [tab['id'] for tab in self.tabs if tab['id'] in self.recovery_tab_ids]
+        }
+        
+        self.autosave_thread = threading.Thread(
+            target=self.autosave_worker,
+            args=(self.recovery_session_dir, session_info, tab_snapshots, image_blobs),
+            daemon=True
+        )
+        self.autosave_thread.start()
+        self.root.after(100, self.poll_autosave)
+    
+    def autosave_worker(self, session_dir, session_info, tab_snapshots, image_blobs):
+        """后台线程：将标签页快照与图片写入恢复目录（每个文件先写临时文件再替换）"""
+        def write_atomic(path, data):
+            temp_path = path + '.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        
+        try:
+            image_dir = os.path.join(session_dir, 'images')
+            os.makedirs(image_dir, exist_ok=True)
+            for image_hash, image_bytes in image_blobs.items():
+                image_path = os.path.join(image_dir, image_hash)
+                if not os.path.exists(image_path):
+                    write_atomic(image_path, image_bytes)
+            for snapshot in tab_snapshots:
+                write_atomic(os.path.join(session_dir, f"tab_{snapshot['id']}.json"),
+                             json.dumps(snapshot, ensure_ascii=False).encode('utf-8'))
+            write_atomic(os.path.join(session_dir, 'session.json'),
+                         json.dumps(session_info, ensure_ascii=False).encode('utf-8'))
+            
+            # 清理已关闭标签页的快照
+            keep = {f"tab_{tab_id}.json" for tab_id in session_info['tab_ids']}
+            for name in os.listdir(session_dir):
+                if name.startswith('tab_') and name.endswith('.json') and name not in keep:
+                    os.remove(os.path.join(session_dir, name))
+        except Exception as e:
+            print(f"写入恢复快照失败: {e}")
+    
+    def poll_autosave(self):
+        """轮询恢复快照写入线程是否结束"""
+        if self.autosave_thread is None:
+            return
+        if self.autosave_thread.is_alive():
+            self.root.after(100, self.poll_autosave)
+            return
+        self.autosave_thread = None
+    
+    def discard_recovery_session(self):
+        """删除本会话的恢复快照（项目已保存或正常退出时），锁文件保留到进程退出"""
+        import shutil
+        if self.autosave_thread is not None:
+            # 正在写入的快照结束后再删除
+            self.root.after(100, self.discard_recovery_session)
+            return
+        try:
+            names = os.listdir(self.recovery_session_dir)
+        except OSError:
+            names = []
+        for name in names:
+            if name == RECOVERY_LOCK_NAME:
+                continue
+            path = os.path.join(self.recovery_session_dir, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        self.recovery_tab_ids.clear()
+        for tab in self.tabs:
+            tab['autosaved_revision'] = tab.get('revision', 0)
+    
+    def check_recovery_snapshots(self):
+        """启动时检查异常退出的会话遗留的恢复快照，询问恢复、删除或保留到下次启动
+
+        仍在运行的其他编辑器进程持有其会话锁，跳过；检查期间持有遗留会话的锁，避免同时启动的实例重复恢复
+        """
+        try:
+            names = sorted(os.listdir(RECOVERY_DIR))
+        except OSError:
+            return
+        sessions = []  # (会话目录, 锁文件)
+        for name in names:
+            session_dir = os.path.join(RECOVERY_DIR, name)
+            if session_dir == self.recovery_session_dir or not os.path.isdir(session_dir):
+                continue
+            try:
+                lock_file = lock_session_dir(session_dir)
+            except OSError:
+                continue
+            if lock_file is None:
+                continue
+            if os.path.exists(os.path.join(session_dir, 'session.json')):
+                sessions.append((session_dir, lock_file))
+            else:
+                # 没有写入过快照的会话，没有可恢复的内容
+                remove_session_dir(session_dir, lock_file)
+        if not sessions:
+            return
+        
+        response = messagebox.askyesnocancel(
+            "恢复未保存的内容",
+            f"检测到 {len(sessions)} 个异常退出时留下的恢复快照。\n\n"
+            "是：恢复为新的标签页\n否：删除这些快照\n取消：保留快照，下次启动时再询问"
+        )
+        if response is None:
+            for session_dir, lock_file in sessions:
+                lock_file.close()
+            return
+        if not response:
+            for session_dir, lock_file in sessions:
+                remove_session_dir(session_dir, lock_file)
+            return
+        
+        restored = 0
+        failed = 0
+        first_index = len(self.tabs)
+        for session_dir, lock_file in sessions:
+            try:
+                restored += self.restore_recovery_session(session_dir)
+            except Exception as e:
+                # 恢复失败的快照保留在磁盘上
+                print(f"恢复快照失败: {e}")
+                failed += 1
+                lock_file.close()
+                continue
+            remove_session_dir(session_dir, lock_file)
+        if restored:
+            self.switch_to_tab(first_index)
+            self.mark_project_modified()
+            self.show_message("恢复完成", f"已恢复 {restored} 个标签页", "info")
+        if failed:
+            self.show_message("恢复失败", f"{failed} 个恢复快照无法读取，已保留在: {RECOVERY_DIR}", "warning")
+    
+    def restore_recovery_session(self, session_dir):
+        """将一个恢复会话中的标签页快照追加为延迟加载的标签页，返回恢复的数量"""
+        with open(os.path.join(session_dir, 'session.json'), 'r', encoding='utf-8') as f:
+            session_info = json.load(f)
+        
+        restored = 0
+        for tab_id in session_info.get('tab_ids', []):
+            tab_path = os.path.join(session_dir, f"tab_{tab_id}.json")
+            if not os.path.exists(tab_path):
+                continue
+            with open(tab_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            
+            pending_images = []
+            for img_data in snapshot.get('images', []):
+                image_path = os.path.join(session_dir, 'images', img_data['image_ref'])
+                try:
+                    with open(image_path, 'rb') as f:
+                        self.register_image_data(f.read(), img_data['image_ref'])
+                    pending_images.append(img_data)
+                except OSError as e:
+                    print(f"恢复图片时出错: {e}")
+            
+            self.tab_counter += 1
+            style_runs, styles = self.tab_style_runs(snapshot)
+            self.tabs.append({
+                'id': self.tab_counter,
+                'title': snapshot.get('title', f'恢复{self.tab_counter}'),
+                'filename': snapshot.get('filename'),
+                'content': snapshot.get('content', ''),
+                'images': [],
+                'image_info': {},
+                'modified': False,
+                'cursor_pos': '1.0',
+                'custom_color': snapshot.get('custom_color'),
+                'style_runs': style_runs,
+                'styles': styles,
+                'revision': 1,
+                'hydrated': False,
+                'pending_images': pending_images
+            })
+            self.set_tab_modified(self.tabs[-1], True)  # 恢复的内容尚未保存
+            self.create_tab_ui(len(self.tabs) - 1)
+            restored += 1
+        return restored
     
     def get_system_fonts(self):
         """获取系统所有可用字体"""
@@ -2941,11 +5669,7 @@ class TopMostEditor:
         try:
             start = self.text_editor.index(tk.SEL_FIRST)
             end = self.text_editor.index(tk.SEL_LAST)
-            
-            import time
-            tag_name = f'font_{int(time.time() * 1000)}'
-            self.text_editor.tag_add(tag_name, start, end)
-            self.text_editor.tag_config(tag_name, font=(font_name, font_size))
+            self.apply_style(start, end, {'font': (font_name, font_size)})
             
         except tk.TclError:
             self.show_message("警告", "请先选中要更改字体的文字", "warning")
@@ -3003,10 +5727,6 @@ class TopMostEditor:
             start = self.text_editor.index(tk.SEL_FIRST)
             end = self.text_editor.index(tk.SEL_LAST)
             
-            import time
-            tag_name = f'size_{int(time.time() * 1000)}'
-            self.text_editor.tag_add(tag_name, start, end)
-            
             # 获取当前字体
             current_font = self.text_editor.cget('font')
             if isinstance(current_font, str):
@@ -3014,7 +5734,7 @@ class TopMostEditor:
             else:
                 font_family = current_font[0] if current_font else 'Arial'
                 
-            self.text_editor.tag_config(tag_name, font=(font_family, size))
+            self.apply_style(start, end, {'font': (font_family, size)})
         except tk.TclError:
             pass
 
@@ -3027,11 +5747,7 @@ class TopMostEditor:
         try:
             start = self.text_editor.index(tk.SEL_FIRST)
             end = self.text_editor.index(tk.SEL_LAST)
-            
-            import time
-            tag_name = f'underline_{int(time.time() * 1000)}'
-            self.text_editor.tag_add(tag_name, start, end)
-            self.text_editor.tag_config(tag_name, underline=True)
+            self.apply_style(start, end, {'underline': True})
         except tk.TclError:
             pass
 
@@ -3053,7 +5769,8 @@ class TopMostEditor:
         
         if pos:
             # 找到了，高亮显示
-            end_pos = f"{pos}+{len(search_text)}c"
+            line_index = self.document_index()
+            end_pos = line_index.index(line_index.offset(pos) + len(search_text))
             self.text_editor.tag_add('found', pos, end_pos)
             self.text_editor.tag_config('found', background='yellow')
             
@@ -3111,23 +5828,19 @@ class TopMostEditor:
             return
             
         # 搜索选项
-        nocase = 0 if self.match_case.get() else 1
-        
-        count = 0
-        start_pos = '1.0'
-        
-        while True:
-            pos = self.text_editor.search(search_text, start_pos, 
-                                         stopindex=tk.END, nocase=nocase)
-            if not pos:
-                break
-                
-            end_pos = f"{pos}+{len(search_text)}c"
+        flags = 0 if self.match_case.get() else re.IGNORECASE
+        
+        # 先在文本中找出所有匹配并换算为索引，再从后往前替换，前面的索引不受影响
+        content = self.text_editor.get('1.0', tk.END)
+        line_index = self.document_index()
+        matches = [(line_index.index(match.start()), line_index.index(match.end()))
+                   for match in re.finditer(re.escape(search_text), content, flags)]
+        # 批量修改后偏移表在下次使用时重建，不逐次增量更新
+        self.invalidate_document_index()
+        for pos, end_pos in reversed(matches):
             self.text_editor.delete(pos, end_pos)
             self.text_editor.insert(pos, replace_text)
-            
-            count += 1
-            start_pos = f"{pos}+{len(replace_text)}c"
+        count = len(matches)
         
         self.show_message("替换完成", f"共替换了 {count} 处", "info")
     
@@ -3137,23 +5850,12 @@ class TopMostEditor:
             start = self.text_editor.index(tk.SEL_FIRST)
             end = self.text_editor.index(tk.SEL_LAST)
             
-            # 获取选中文字的所有标签
-            tags = self.text_editor.tag_names(start)
+            # 合并选区起点处字符的所有样式（同一属性不会来自两个样式）
+            offset = self.document_index().offset(start)
             format_info = {}
             
-            for tag in tags:
-                if tag.startswith('color_') or tag.startswith('size_') or tag.startswith('font_') or tag == 'underline':
-                    tag_config = self.text_editor.tag_cget(tag, 'font')
-                    if tag_config:
-                        format_info['font'] = tag_config
-                    
-                    tag_color = self.text_editor.tag_cget(tag, 'foreground')
-                    if tag_color:
-                        format_info['foreground'] = tag_color
-                    
-                    tag_underline = self.text_editor.tag_cget(tag, 'underline')
-                    if tag_underline:
-                        format_info['underline'] = tag_underline
+            for style_id in self.document_style_runs().at(offset):
+                format_info.update(self.styles[style_id])
             
             # 保存格式信息
             self.copied_format = format_info
@@ -3172,20 +5874,8 @@ class TopMostEditor:
             start = self.text_editor.index(tk.SEL_FIRST)
             end = self.text_editor.index(tk.SEL_LAST)
             
-            # 创建唯一标签名
-            import time
-            tag_name = f'format_{int(time.time() * 1000)}'
-            
-            # 应用标签到选中文字
-            self.text_editor.tag_add(tag_name, start, end)
-            
             # 应用复制的格式
-            if 'font' in self.copied_format:
-                self.text_editor.tag_config(tag_name, font=self.copied_format['font'])
-            if 'foreground' in self.copied_format:
-                self.text_editor.tag_config(tag_name, foreground=self.copied_format['foreground'])
-            if 'underline' in self.copied_format:
-                self.text_editor.tag_config(tag_name, underline=self.copied_format['underline'])
+            self.apply_style(start, end, self.copied_format)
             
             self.show_message("格式粘贴", "格式已应用", "info")
             
@@ -3272,7 +5962,7 @@ class TopMostEditor:
                         
                         # 立即应用到当前编辑器
                         default_font = font.Font(family=font_name, size=font_size)
-                        self.text_editor.config(font=default_font)
+                        self.configure_text_widgets(font=default_font)
                         
                         self.show_message("设置成功", f"默认字体已设置为 {font_name} {font_size}", "info")
                         font_window.destroy()
@@ -3297,6 +5987,38 @@ class TopMostEditor:
                 font_listbox.selection_set(0)
                 update_preview()
     
+    def load_editor_settings(self):
+        """加载编辑器设置，缺失的项使用默认值"""
+        settings = dict(DEFAULT_SETTINGS)
+        settings_file = os.path.join(os.path.dirname(__file__), SETTINGS_FILE)
+        try:
+            if os.path.exists(settings_file):
+                with open(settings_file, 'r', encoding='utf-8') as f:
+                    settings.update(json.load(f))
+        except Exception as e:
+            print(f"加载编辑器设置失败: {str(e)}")
+        return settings
+    
+    def save_editor_settings(self):
+        """保存编辑器设置"""
+        settings_file = os.path.join(os.path.dirname(__file__), SETTINGS_FILE)
+        try:
+            with open(settings_file, 'w', encoding='utf-8') as f:
+                json.dump(self.settings, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"保存编辑器设置失败: {str(e)}")
+    
+    def toggle_project_journal(self):
+        """切换项目增量保存（追加日志）模式"""
+        self.settings['project_journal'] = self.journal_var.get()
+        self.save_editor_settings()
+    
+    def change_compression(self):
+        """切换 .rted/.rtep 的压缩方式与级别"""
+        self.settings['compression'] = self.compression_var.get()
+        self.settings['compression_level'] = self.compression_level_var.get()
+        self.save_editor_settings()
+    
     def load_default_font(self):
         """加载默认字体设置"""
         default_font_file = os.path.join(os.path.dirname(__file__), 'default_font.json')
@@ -3310,7 +6032,7 @@ class TopMostEditor:
                     family=font_config.get('font_family', 'Arial'),
                     size=font_config.get('font_size', 12)
                 )
-                self.text_editor.config(font=default_font)
+                self.configure_text_widgets(font=default_font)
                 return True
         except Exception as e:
             print(f"加载默认字体失败: {str(e)}")
@@ -3419,7 +6141,7 @@ class TopMostEditor:
         
         # 获取所有标签
         all_tags = self.text_editor.tag_names()
-        color_tags = [tag for tag in all_tags if tag.startswith('color_')]
+        color_tags = [tag for tag in all_tags if tag.startswith(FORMAT_TAG_PREFIXES)]
         
         debug_info.append(f"总标签数: {len(all_tags)}")
         debug_info.append(f"颜色标签数: {len(color_tags)}")
@@ -3430,8 +6152,8 @@ class TopMostEditor:
             debug_info.append("颜色标签详情:")
             for tag_name in color_tags:
                 ranges = self.text_editor.tag_ranges(tag_name)
-                color = self.text_editor.tag_cget(tag_name, 'foreground')
-                debug_info.append(f"  {tag_name}: 颜色={color}, 范围数={len(ranges)//2}")
+                style = self.tag_style(self.text_editor, tag_name)
+                debug_info.append(f"  {tag_name}: 样式={style}, 范围数={len(ranges)//2}")
                 
                 for i in range(0, len(ranges), 2):
                     if i + 1 < len(ranges):
@@ -3448,11 +6170,13 @@ class TopMostEditor:
         # 检查当前标签页的颜色信息
         if self.current_tab_index < len(self.tabs):
             current_tab = self.tabs[self.current_tab_index]
-            if 'color_ranges' in current_tab:
-                color_ranges = current_tab['color_ranges']
-                debug_info.append(f"保存的颜色范围数: {len(color_ranges)}")
-                for i, color_range in enumerate(color_ranges):
-                    debug_info.append(f"  范围{i}: {color_range['start']} - {color_range['end']}, 颜色: {color_range['color']}")
+            if 'style_runs' in current_tab:
+                style_runs = current_tab['style_runs']
+                styles = current_tab.get('styles', [])
+                debug_info.append(f"保存的样式段数: {len(style_runs) // 3}")
+                for i in range(0, len(style_runs) - 2, 3):
+                    start, length, position = style_runs[i:i + 3]
+                    debug_info.append(f"  偏移{start} 长度{length}, 样式: {styles[position]}")
             else:
                 debug_info.append("当前标签页没有保存颜色信息")
         
@@ -3478,23 +6202,12 @@ class TopMostEditor:
         # 模拟保存过程
         try:
             # 模拟 save_rich_text_file 的颜色保存逻辑
-            test_color_ranges = []
-            for tag_name in self.text_editor.tag_names():
-                if tag_name.startswith('color_'):
-                    ranges = self.text_editor.tag_ranges(tag_name)
-                    color = self.text_editor.tag_cget(tag_name, 'foreground')
-                    
-                    for i in range(0, len(ranges), 2):
-                        if i + 1 < len(ranges):
-                            test_color_ranges.append({
-                                'start': str(ranges[i]),
-                                'end': str(ranges[i + 1]),
-                                'color': color
-                            })
+            test_runs, test_styles = self.collect_style_runs(self.text_editor)
             
-            debug_info.append(f"模拟保存的颜色范围数: {len(test_color_ranges)}")
-            for i, color_range in enumerate(test_color_ranges):
-                debug_info.append(f"  测试范围{i}: {color_range['start']} - {color_range['end']}, 颜色: {color_range['color']}")
+            debug_info.append(f"模拟保存的样式段数: {len(test_runs) // 3}, 样式数: {len(test_styles)}")
+            for i in range(0, len(test_runs) - 2, 3):
+                start, length, position = test_runs[i:i + 3]
+                debug_info.append(f"  测试样式段: 偏移{start} 长度{length}, 样式: {test_styles[position]}")
                 
         except Exception as e:
             debug_info.append(f"模拟保存时出错: {str(e)}")
@@ -3542,7 +6255,7 @@ class TopMostEditor:
         debug_info.append("=== 当前文本颜色标签调试信息 ===")
         
         all_tags = self.text_editor.tag_names()
-        color_tags = [tag for tag in all_tags if tag.startswith('color_')]
+        color_tags = [tag for tag in all_tags if tag.startswith(FORMAT_TAG_PREFIXES)]
         
         debug_info.append(f"总标签数: {len(all_tags)}")
         debug_info.append(f"颜色标签数: {len(color_tags)}")
@@ -3553,8 +6266,8 @@ class TopMostEditor:
             debug_info.append("颜色标签详情:")
             for tag_name in color_tags:
                 ranges = self.text_editor.tag_ranges(tag_name)
-                color = self.text_editor.tag_cget(tag_name, 'foreground')
-                debug_info.append(f"  {tag_name}: 颜色={color}, 范围数={len(ranges)//2}")
+                style = self.tag_style(self.text_editor, tag_name)
+                debug_info.append(f"  {tag_name}: 样式={style}, 范围数={len(ranges)//2}")
                 
                 for i in range(0, len(ranges), 2):
                     if i + 1 < len(ranges):
@@ -3570,11 +6283,13 @@ class TopMostEditor:
         
         if self.current_tab_index < len(self.tabs):
             current_tab = self.tabs[self.current_tab_index]
-            if 'color_ranges' in current_tab:
-                color_ranges = current_tab['color_ranges']
-                debug_info.append(f"保存的颜色范围数: {len(color_ranges)}")
-                for i, color_range in enumerate(color_ranges):
-                    debug_info.append(f"  范围{i}: {color_range['start']} - {color_range['end']}, 颜色: {color_range['color']}")
+            if 'style_runs' in current_tab:
+                style_runs = current_tab['style_runs']
+                styles = current_tab.get('styles', [])
+                debug_info.append(f"保存的样式段数: {len(style_runs) // 3}")
+                for i in range(0, len(style_runs) - 2, 3):
+                    start, length, position = style_runs[i:i + 3]
+                    debug_info.append(f"  偏移{start} 长度{length}, 样式: {styles[position]}")
             else:
                 debug_info.append("当前标签页没有保存颜色信息")
         
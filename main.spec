@@ -19,6 +19,17 @@ a = Analysis(
         'tkinter.scrolledtext',
         'json',
         'base64',
+        'struct',
+        'hashlib',
+        'threading',
+        'queue',
+        'concurrent.futures',
+        'zlib',
+        'lzma',
+        'bz2',
+        'gzip',
+        'shutil',
+        'time',
         'io',
         'ctypes',
         're',
@@ -0,0 +1,46 @@
+"""项目文件容器（.rtep 2.0）的损坏恢复测试：python -m pytest tests"""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main  # noqa: E402
+
+
+def project(content, revision):
+    return {'version': '2.0', 'tabs': [{'id': 1, 'title': 'a', 'content': content, 'revision': revision}]}
+
+
+class ProjectContainerRecoveryTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'project.rtep')
+
+    def test_truncated_journal_manifest_falls_back_to_previous(self):
+        """追加日志写清单时中断（只剩长度为 0 的清单块头）时，打开上一个完整清单"""
+        layout = main.write_project_file_atomic(self.path, project('first', 1))
+        main.write_project_container(self.path, project('second', 2), journal_layout=layout)
+        with open(self.path, 'rb') as file:
+            data = file.read()
+        manifest_offset = data.rindex(main.CHUNK_MANIFEST)
+        with open(self.path, 'wb') as file:
+            file.write(data[:manifest_offset])
+            file.write(main.CHUNK_HEADER.pack(main.CHUNK_MANIFEST, main.CODEC_RAW, 0))
+
+        self.assertEqual(main.load_project_data(self.path)['tabs'][0]['content'], 'first')
+
+    def test_trailer_pointing_at_garbage_falls_back_to_scan(self):
+        """文件尾指向的不是清单块时，扫描找到最后一个完整清单"""
+        main.write_project_file_atomic(self.path, project('first', 1))
+        with open(self.path, 'ab') as file:
+            offset = file.tell()
+            file.write(b'\x00garbage')
+            file.write(main.PROJECT_TRAILER.pack(main.TRAILER_MAGIC, offset))
+
+        self.assertEqual(main.load_project_data(self.path)['tabs'][0]['content'], 'first')
+
+
+if __name__ == '__main__':
+    unittest.main()